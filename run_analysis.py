@@ -6,30 +6,146 @@ Usage:
     python run_analysis.py                  # Full analysis
     python run_analysis.py --quick          # Just TWFE estimate
     python run_analysis.py --ticker SNOW    # Single IPO
+    python run_analysis.py --all-tickers    # Pre/post lockup effect for every IPO, ranked
+    python run_analysis.py --jackknife      # Leave-one-IPO-out: does one firm drive the effect?
+    python run_analysis.py --robustness     # Windows, placebos, size split, Goodman-Bacon -> registry + figures
+    python run_analysis.py --actual-lockups # Event time from each IPO's actual lockup date, not day 180
+    python run_analysis.py --cohorts 2020 2021  # Only these IPO years (reads just their partitions)
+    python run_analysis.py --figures        # Re-render figures from saved results (no estimation)
+    python run_analysis.py serve            # Keep data loaded, answer queries on localhost:8765
 """
 import argparse
+import pandas as pd
+from pathlib import Path
 from src.data_loader import IPODataLoader
-from src.estimators import TWFEEstimator, EventStudyEstimator
+from src.estimators import TWFEEstimator, EventStudyEstimator, per_entity_lockup_effects
+from src.results_registry import ResultsRegistry, data_fingerprint
+
+OUTPUT_DIR = Path(__file__).resolve().parent / 'outputs'
+
+
+def render_charts(registry: ResultsRegistry):
+    """Redraw registry-backed figures (unchanged ones are skipped)."""
+    from src.figures import render_figures
+
+    print("\nRendering figures...")
+    for name, status in render_figures(registry, OUTPUT_DIR / 'figures').items():
+        print(f"  {name}: {status}")
+
+
+def serve(panel_clean, port: int):
+    """Keep the prepared panel in memory and answer HTTP queries."""
+    from src.server import AnalysisService, make_server
+
+    server = make_server(AnalysisService(panel_clean), port=port)
+    print(f"Serving on http://127.0.0.1:{server.server_address[1]} (Ctrl+C to stop)")
+    print("  /twfe  /twfe?ticker=SNOW  /event_study?bins=-30,-20,-10,0,10,20,30  /ticker?symbol=SNOW")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopped")
+    finally:
+        server.server_close()
+
+
+def run_robustness(panel_clean, registry: ResultsRegistry, record: bool, render: bool):
+    """Robustness specs from notebook 03 plus Goodman-Bacon, as one registry run."""
+    from src.robustness import lockup_day_entries, size_entries, goodman_bacon_entries
+
+    fingerprint = data_fingerprint(panel_clean)
+    print("Running robustness specs (lockup windows, placebos, size)...")
+    entries = lockup_day_entries(panel_clean, fingerprint) + size_entries(panel_clean, fingerprint)
+    for entry in entries:
+        result = entry['result']
+        print(f"  {entry['category']:14s} {entry['label']:12s} {result.coefficient:+.4f}% (p={result.p_value:.4f})")
+
+    print("\nGoodman-Bacon decomposition...")
+    bacon = goodman_bacon_entries(panel_clean, fingerprint)
+    if bacon:
+        decomp = pd.DataFrame([{'comparison': e['label'], 'weight': e['result']['weight']} for e in bacon])
+        print(decomp.groupby('comparison')['weight'].sum().round(4).to_string())
+
+    if not record:
+        return
+    registry.record_many(entries + bacon)
+    if render:
+        render_charts(registry)
 
 
 def main():
     parser = argparse.ArgumentParser(description='Run IPO lockup DiD analysis')
+    parser.add_argument('command', nargs='?', choices=['serve'], help='serve: run the warm query server')
+    parser.add_argument('--port', type=int, default=8765, help='Port for serve mode')
     parser.add_argument('--quick', action='store_true', help='Quick TWFE only')
     parser.add_argument('--ticker', type=str, help='Analyze single ticker')
+    parser.add_argument('--all-tickers', action='store_true', help='Per-IPO lockup effects for every ticker')
+    parser.add_argument('--actual-lockups', action='store_true',
+                        help="Use each IPO's Lockup_Expiration (trading days) instead of day 180")
+    parser.add_argument('--cohorts', nargs='+', help='Only IPOs from these years/quarters, e.g. 2020 2021 or 2020Q3')
+    parser.add_argument('--jackknife', action='store_true', help='Leave-one-IPO-out influence diagnostics')
+    parser.add_argument('--robustness', action='store_true',
+                        help='Lockup windows, placebo days, size split and Goodman-Bacon (feeds the figures)')
     parser.add_argument('--no-charts', action='store_true', help='Skip plotting')
+    parser.add_argument('--figures', action='store_true', help='Only re-render figures from the results registry')
     args = parser.parse_args()
 
+    registry = ResultsRegistry(OUTPUT_DIR / 'results' / 'registry.sqlite')
+    if args.figures:
+        render_charts(registry)
+        return
+
     # Load data
     print("Loading data...")
     loader = IPODataLoader()
 
     try:
-        lockup_panel = loader.load_stock_data(market_adjusted=True)
+        lockup_panel = loader.load_stock_data(
+            market_adjusted=True, actual_lockups=args.actual_lockups, cohorts=args.cohorts
+        )
     except FileNotFoundError:
         print("ERROR: Data files not found. Run notebook 01_data_collection.ipynb first.")
         return
 
     panel_clean = loader.prepare_panel_data(lockup_panel)
+    # Registry column is an integer day; actual-lockup runs store NULL
+    lockup_day = None if args.actual_lockups else 180
+    # Cohort subsets stay out of the registry - exports and figures take the
+    # latest run, which would publish the subset as the baseline
+    record = not args.cohorts
+
+    if args.command == 'serve':
+        serve(panel_clean, args.port)
+        return
+
+    if args.all_tickers:
+        print(f"Per-IPO lockup effects ({panel_clean['Ticker'].nunique()} IPOs)...\n")
+        effects = per_entity_lockup_effects(panel_clean)
+        fingerprint = data_fingerprint(panel_clean)
+        print(effects.to_string(index=False, float_format=lambda x: f"{x:.4f}"))
+        if record:
+            registry.record_many([
+                {
+                    'result': row, 'kind': 'per_ticker', 'label': row['Ticker'],
+                    'spec': {'estimator': 'PrePost', 'outcome': 'Abnormal_Return', 'lockup_day': lockup_day},
+                    'fingerprint': fingerprint
+                }
+                for row in effects.to_dict('records')
+            ])
+        sig = effects['p_value'] < 0.05
+        print(f"\n{sig.sum()} of {len(effects)} IPOs individually significant at 5%")
+        return
+
+    if args.robustness:
+        run_robustness(panel_clean, registry, record, render=not args.no_charts)
+        return
+
+    if args.jackknife:
+        jk = TWFEEstimator().jackknife(panel_clean)
+        print(f"TWFE effect: {jk.coefficient:+.4f}% (clustered SE {jk.std_error:.4f}, jackknife SE {jk.jackknife_se:.4f})\n")
+        print("Most influential IPOs (effect without them):")
+        print(jk.influence.head(10).to_string(index=False, float_format=lambda x: f"{x:.4f}"))
+        print(f"\nFlagged (high leverage/influence): {', '.join(jk.flagged) if jk.flagged else 'none'}")
+        return
 
     if args.ticker:
         panel_clean = panel_clean[panel_clean['Ticker'] == args.ticker.upper()]
@@ -45,6 +161,17 @@ def main():
     twfe = TWFEEstimator()
     twfe_result = twfe.estimate(panel_clean)
 
+    # Full-sample runs go in the registry (figures and CSV exports read from it)
+    fingerprint = data_fingerprint(panel_clean)
+    if record and not args.ticker:
+        registry.record(
+            twfe_result,
+            spec={'outcome': 'Abnormal_Return', 'treatment': 'Post_Lockup', 'lockup_day': lockup_day, 'cov_type': 'clustered'},
+            fingerprint=fingerprint,
+            label='Baseline (actual lockups)' if args.actual_lockups else 'Baseline (Day 180)',
+            category='baseline'
+        )
+
     print(f"\nMain Result:")
     print(f"  Effect:   {twfe_result.coefficient:+.4f}%")
     print(f"  Std Err:  {twfe_result.std_error:.4f}%")
@@ -65,6 +192,12 @@ def main():
     es = EventStudyEstimator()
     event_results = es.estimate(panel_clean, pre_window=30, post_window=30)
     print(f"  Estimated {len(event_results)} event-time coefficients")
+    if record and not args.ticker:
+        registry.record_event_study(
+            event_results,
+            spec={'outcome': 'Abnormal_Return', 'lockup_day': lockup_day, 'pre_window': 30, 'post_window': 30},
+            fingerprint=fingerprint
+        )
 
     # Summary stats
     print(f"\nData summary:")
@@ -73,6 +206,9 @@ def main():
     print(f"  Pre-lockup obs: {(panel_clean['Post_Lockup']==0).sum():,}")
     print(f"  Post-lockup obs: {(panel_clean['Post_Lockup']==1).sum():,}")
 
+    if not args.no_charts and record and not args.ticker:
+        render_charts(registry)
+
     print("\nDone!")
 
 
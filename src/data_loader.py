@@ -1,8 +1,14 @@
 """Data loading and preprocessing for IPO analysis."""
+import json
+import warnings
 import pandas as pd
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .quantile_sketch import ReturnSketches, winsorize
+from .trading_calendar import TradingCalendar, lockup_event_time
 
 
 class IPODataLoader:
@@ -11,8 +17,7 @@ class IPODataLoader:
     def __init__(self, data_dir: str = "../data"):
         self.data_dir = Path(data_dir)
 
-    def load_stock_data(self, market_adjusted: bool = True) -> pd.DataFrame:
-        """Load stock data (market-adjusted or raw)."""
+    def _stock_file(self, market_adjusted: bool) -> Path:
         filename = "stock_prices_ipo_adjusted.csv" if market_adjusted else "stock_prices_ipo.csv"
         filepath = self.data_dir / "processed" / filename
 
@@ -21,24 +26,230 @@ class IPODataLoader:
                 f"Data file not found: {filepath}\n"
                 "Run notebook 01_data_collection.ipynb first to download the data."
             )
+        return filepath
+
+    def _partition_dir(self, market_adjusted: bool) -> Path:
+        # Partitioned copy sits next to the CSV it replaces, e.g. processed/stock_prices_ipo_adjusted/
+        stem = "stock_prices_ipo_adjusted" if market_adjusted else "stock_prices_ipo"
+        return self.data_dir / "processed" / stem
+
+    @staticmethod
+    def _cohort_keys(ipo_dates: pd.Series, by: str) -> pd.Series:
+        if by == 'year':
+            return ipo_dates.dt.year.astype(str)
+        if by == 'quarter':
+            return ipo_dates.dt.to_period('Q').astype(str)
+        raise ValueError(f"by must be 'year' or 'quarter', got '{by}'")
 
+    @staticmethod
+    def _cohort_mask(ipo_dates: pd.Series, cohorts: Iterable) -> np.ndarray:
+        """Rows whose IPO year or quarter is in cohorts ('2020' or '2020Q3')."""
+        wanted = {str(c) for c in cohorts}
+        quarters = ipo_dates.dt.to_period('Q').astype(str)
+        return (quarters.isin(wanted) | quarters.str[:4].isin(wanted)).to_numpy()
+
+    def _source_stamp(self, market_adjusted: bool) -> Optional[Dict]:
+        # Size + mtime of the single CSV, so partitions made from an older
+        # copy are noticed after a refresh
         try:
-            df = pd.read_csv(filepath, parse_dates=['Date', 'IPO_Date'])
-        except Exception as e:
-            raise RuntimeError(f"Failed to read {filepath}: {str(e)}") from e
+            stat = self._stock_file(market_adjusted).stat()
+        except FileNotFoundError:
+            return None
+        return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+    @staticmethod
+    def _add_lockup_vars(df: pd.DataFrame) -> pd.DataFrame:
+        # Add derived variables (lockup at day 180)
+        df['Post_Lockup'] = (df['Days_Since_IPO'] > 180).astype(int)
+        df['Days_To_Lockup'] = df['Days_Since_IPO'] - 180
+        return df
+
+    def load_stock_data(
+        self,
+        market_adjusted: bool = True,
+        actual_lockups: bool = False,
+        cohorts: Optional[Iterable] = None,
+        max_workers: Optional[int] = None
+    ) -> pd.DataFrame:
+        """Load stock data (market-adjusted or raw).
+
+        actual_lockups=True measures event time from each IPO's
+        Lockup_Expiration in the metadata (trading days, see
+        add_actual_lockups) instead of assuming day 180 for everyone.
+
+        If the data has been partitioned (see partition_stock_data) the
+        partitions are read in parallel, and cohorts=[2020, 2021] only reads
+        those IPO years (or quarters like '2020Q3'). Without partitions -
+        or if the CSV changed since they were written - the single CSV is
+        read and filtered the same way.
+        """
+        manifest = self._current_manifest(market_adjusted)
+        if manifest is not None:
+            df = self._read_partitions(self._partition_dir(market_adjusted), manifest, cohorts, max_workers)
+        else:
+            filepath = self._stock_file(market_adjusted)
+
+            try:
+                df = pd.read_csv(filepath, parse_dates=['Date', 'IPO_Date'])
+            except Exception as e:
+                raise RuntimeError(f"Failed to read {filepath}: {str(e)}") from e
+
+            if cohorts is not None:
+                df = df[self._cohort_mask(df['IPO_Date'], cohorts)].reset_index(drop=True)
 
         # Sanity check - make sure we actually loaded something
         if len(df) == 0:
-            raise ValueError(f"File {filepath} is empty!")
+            raise ValueError("No stock data loaded - empty file or no rows for the requested cohorts")
 
         # print(f"DEBUG: Loaded {len(df)} rows, {df['Ticker'].nunique()} tickers")
 
-        # Add derived variables (lockup at day 180)
-        df['Post_Lockup'] = (df['Days_Since_IPO'] > 180).astype(int)
-        df['Days_To_Lockup'] = df['Days_Since_IPO'] - 180
+        df = self._add_lockup_vars(df)
+        if actual_lockups:
+            df = self.add_actual_lockups(df)
+        return df
+
+    def partition_stock_data(
+        self,
+        df: Optional[pd.DataFrame] = None,
+        by: str = 'year',
+        market_adjusted: bool = True,
+        update: bool = False
+    ) -> Dict:
+        """Split the stock data into one CSV per IPO cohort plus a manifest.
+
+        df defaults to the single processed CSV. With update=True only the
+        cohorts present in df are rewritten (e.g. after refreshing recent
+        IPOs) and the other partitions are kept. Returns the manifest.
+        """
+        if df is None:
+            df = pd.read_csv(self._stock_file(market_adjusted), parse_dates=['Date', 'IPO_Date'])
+        # Derived columns are recomputed on load
+        df = df.drop(columns=['Post_Lockup', 'Days_To_Lockup', 'Lockup_Tranche'], errors='ignore')
 
+        part_dir = self._partition_dir(market_adjusted)
+        old = self.load_partition_manifest(market_adjusted) if update else None
+        if old is not None and old['by'] != by:
+            raise ValueError(f"Existing partitions are by '{old['by']}', can't update by '{by}'")
+        part_dir.mkdir(parents=True, exist_ok=True)
+        if old is None:
+            for stale in part_dir.glob("ipo_*.csv"):
+                stale.unlink()
+
+        partitions = {p['key']: p for p in old['partitions']} if old else {}
+        for key, part in df.groupby(self._cohort_keys(df['IPO_Date'], by), sort=True):
+            filename = f"ipo_{by}={key}.csv"
+            part.sort_values(['Ticker', 'Date']).to_csv(part_dir / filename, index=False)
+            partitions[key] = {
+                'key': key,
+                'file': filename,
+                'n_rows': len(part),
+                'n_tickers': int(part['Ticker'].nunique()),
+                'date_min': str(part['Date'].min().date()),
+                'date_max': str(part['Date'].max().date()),
+            }
+
+        manifest = {
+            'by': by,
+            'source': self._source_stamp(market_adjusted),
+            'partitions': [partitions[k] for k in sorted(partitions)]
+        }
+        (part_dir / "manifest.json").write_text(json.dumps(manifest, indent=2))
+        return manifest
+
+    def load_partition_manifest(self, market_adjusted: bool = True) -> Optional[Dict]:
+        """Partition manifest (row counts, date ranges per cohort), or None if not partitioned."""
+        path = self._partition_dir(market_adjusted) / "manifest.json"
+        return json.loads(path.read_text()) if path.exists() else None
+
+    def _current_manifest(self, market_adjusted: bool) -> Optional[Dict]:
+        """Manifest if the partitions are usable, None to read the single CSV instead."""
+        manifest = self.load_partition_manifest(market_adjusted)
+        if manifest is None:
+            return None
+        source = self._source_stamp(market_adjusted)
+        if source is not None and manifest.get('source') != source:
+            warnings.warn(
+                f"{self._stock_file(market_adjusted)} changed since it was partitioned - reading the CSV "
+                "(re-run partition_stock_data to use the partitions again)"
+            )
+            return None
+        return manifest
+
+    def _select_partitions(self, manifest: Dict, cohorts: Optional[Iterable]) -> List[Dict]:
+        if cohorts is None:
+            return manifest['partitions']
+        # Only prunes files - rows are filtered with _cohort_mask after reading,
+        # so '2020Q3' on year partitions reads 2020 and keeps Q3
+        wanted_years = {str(c)[:4] for c in cohorts}
+        return [p for p in manifest['partitions'] if p['key'][:4] in wanted_years]
+
+    def _read_partitions(
+        self,
+        part_dir: Path,
+        manifest: Dict,
+        cohorts: Optional[Iterable],
+        max_workers: Optional[int]
+    ) -> pd.DataFrame:
+        selected = self._select_partitions(manifest, cohorts)
+        if not selected:
+            return pd.DataFrame(columns=['Date', 'Ticker', 'IPO_Date', 'Days_Since_IPO'])
+
+        def _read(p):
+            filepath = part_dir / p['file']
+            try:
+                part = pd.read_csv(filepath, parse_dates=['Date', 'IPO_Date'])
+            except Exception as e:
+                raise RuntimeError(f"Failed to read {filepath}: {str(e)}") from e
+            if len(part) != p['n_rows']:
+                raise RuntimeError(
+                    f"{filepath} has {len(part)} rows, manifest says {p['n_rows']} - re-run partition_stock_data"
+                )
+            return part
+
+        # Threads, not processes - the C parser releases the GIL and frames
+        # don't have to be pickled back
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            frames = list(pool.map(_read, selected))
+        df = pd.concat(frames, ignore_index=True)
+        if cohorts is not None:
+            df = df[self._cohort_mask(df['IPO_Date'], cohorts)].reset_index(drop=True)
         return df
 
+    def iter_stock_data(self, chunksize: int = 100_000, market_adjusted: bool = True) -> Iterator[pd.DataFrame]:
+        """Same as load_stock_data but in chunks (for files that don't fit in memory)."""
+        manifest = self._current_manifest(market_adjusted)
+        if manifest is not None:
+            part_dir = self._partition_dir(market_adjusted)
+            files = [part_dir / p['file'] for p in manifest['partitions']]
+        else:
+            files = [self._stock_file(market_adjusted)]
+        for filepath in files:
+            for chunk in pd.read_csv(filepath, parse_dates=['Date', 'IPO_Date'], chunksize=chunksize):
+                yield self._add_lockup_vars(chunk)
+
+    def update_return_sketches(
+        self,
+        chunks,
+        column: str = 'Abnormal_Return',
+        path: Optional[Path] = None
+    ) -> ReturnSketches:
+        """One pass over chunks (or a single DataFrame) to update saved quantile sketches.
+
+        Sketches live next to the processed data; rows already folded in
+        (by ticker/date) are skipped, so a refresh only adds new days.
+        """
+        path = Path(path) if path else self.data_dir / "processed" / f"{column.lower()}_sketches.json"
+        sketches = ReturnSketches.load(path) if path.exists() else ReturnSketches(column)
+        if isinstance(chunks, pd.DataFrame):
+            chunks = [chunks]
+        # Compare every chunk against the watermarks from before this refresh
+        since = dict(sketches.last_seen)
+        for chunk in chunks:
+            sketches.update(chunk, since=since)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        sketches.save(path)
+        return sketches
+
     def load_ipo_metadata(self) -> pd.DataFrame:
         """Load IPO metadata (names, dates, sectors)."""
         filepath = self.data_dir / "raw" / "tech_ipos_curated.csv"
@@ -49,13 +260,63 @@ class IPODataLoader:
         df = pd.read_csv(filepath, parse_dates=['IPO_Date', 'Lockup_Expiration'])
         return df
 
-    def prepare_panel_data(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Clean and sort for panel regression."""
+    def load_trading_calendar(self, panel: Optional[pd.DataFrame] = None) -> TradingCalendar:
+        """Trading-day index, cached next to the processed panel.
+
+        Built from the panel's dates; the cache is extended (and re-saved)
+        when a refreshed panel has sessions it hasn't seen.
+        """
+        path = self.data_dir / "processed" / "trading_calendar.npy"
+        calendar = TradingCalendar.load(path) if path.exists() else None
+
+        if panel is not None and (calendar is None or not calendar.covers(panel['Date'].unique())):
+            dates = panel['Date'].dropna().unique()
+            calendar = TradingCalendar(dates) if calendar is None else calendar.extend(dates)
+            calendar.save(path)
+        if calendar is None:
+            raise FileNotFoundError(f"No cached trading calendar at {path} - pass the panel to build it")
+        return calendar
+
+    def add_actual_lockups(
+        self,
+        df: pd.DataFrame,
+        lockups: Optional[pd.DataFrame] = None,
+        lockup_cols: Tuple[str, ...] = ('Lockup_Expiration',)
+    ) -> pd.DataFrame:
+        """Replace the day-180 lockup variables with ones from actual expiration dates.
+
+        lockups defaults to the IPO metadata; extra date columns in
+        lockup_cols (early release, later tranches) add Lockup_Tranche steps.
+        Tickers missing from the metadata keep the day-180 values.
+        """
+        if lockups is None:
+            lockups = self.load_ipo_metadata()
+        return lockup_event_time(df, lockups, self.load_trading_calendar(df), lockup_cols=lockup_cols)
+
+    def prepare_panel_data(
+        self,
+        df: pd.DataFrame,
+        winsorize_quantiles: Optional[Tuple[float, float]] = None,
+        trim: bool = False,
+        by: str = 'ticker',
+        sketches: Optional[ReturnSketches] = None
+    ) -> pd.DataFrame:
+        """Clean and sort for panel regression.
+
+        winsorize_quantiles=(0.01, 0.99) clips extreme abnormal returns per
+        ticker (by='global' for one cutoff); trim=True drops them instead.
+        Cutoffs come from quantile sketches - pass saved ones (see
+        update_return_sketches) to apply the same cutoffs chunk by chunk.
+        """
         # Drop missing returns (only ~1% of obs)
         df_clean = df.dropna(subset=['Abnormal_Return']).copy()
         # Make sure panel is sorted before regression (typo: "befoe")
         df_clean = df_clean.sort_values(['Ticker', 'Date'])
-        # TODO: Add option to winsorize extreme returns (>50% daily moves)
+
+        if winsorize_quantiles is not None:
+            if sketches is None:
+                sketches = ReturnSketches('Abnormal_Return').update(df_clean)
+            df_clean = winsorize(df_clean, sketches, winsorize_quantiles, by=by, trim=trim)
         return df_clean
 
     def get_company_characteristics(self, df: pd.DataFrame) -> pd.DataFrame:
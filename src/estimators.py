@@ -7,14 +7,45 @@ and made results worse. Sticking with unweighted + clustered SEs.
 # Also tried:
 # - Fixed effects with Fama-MacBeth SEs - too conservative
 # - Quantile regression for robustness - didn't help much
+
+linearmodels/scipy are imported inside the functions that need them -
+importing linearmodels alone takes most of a second at startup.
 """
 import pandas as pd
 import numpy as np
-from typing import Dict, Optional, Tuple
-from linearmodels.panel import PanelOLS
+from typing import Dict, List, Optional, Sequence, Tuple
 from dataclasses import dataclass
+import copy
+import json
 import warnings
 
+from .panel_ops import (
+    encode_panel, demean_twoway, entity_offsets, group_sums, segment_sums, twoway_cluster_meat
+)
+
+# 'clustered' = by entity (PanelOLS), 'twoway' = entity + date (Cameron-Gelbach-Miller)
+COV_TYPES = ('clustered', 'twoway')
+
+
+def _check_cov_type(cov_type: str):
+    if cov_type not in COV_TYPES:
+        raise ValueError(f"cov_type must be one of {COV_TYPES}, got '{cov_type}'")
+
+
+def _sandwich(bread: np.ndarray, meat: np.ndarray, scale: float) -> np.ndarray:
+    """scale * bread @ meat @ bread.
+
+    The two-way meat is a difference of meats and isn't guaranteed PSD. If
+    that leaves a negative variance, negative eigenvalues are zeroed
+    (Cameron, Gelbach & Miller 2011); otherwise this is exactly PanelOLS.
+    """
+    cov = scale * bread @ meat @ bread
+    cov = (cov + cov.T) / 2
+    if (np.diag(cov) < 0).any():
+        vals, vecs = np.linalg.eigh(cov)
+        cov = (vecs * np.maximum(vals, 0.0)) @ vecs.T
+    return cov
+
 
 @dataclass
 class DiDResult:
@@ -50,6 +81,16 @@ class DiDResult:
         }
 
 
+@dataclass
+class JackknifeResult:
+    """Leave-one-IPO-out diagnostics for the TWFE treatment coefficient."""
+    coefficient: float
+    std_error: float  # entity-clustered, full sample
+    jackknife_se: float
+    influence: pd.DataFrame  # one row per entity, most influential first
+    flagged: List[str]  # high leverage or high influence
+
+
 class TWFEEstimator:
     """Standard TWFE DiD with two-way fixed effects.
 
@@ -66,11 +107,20 @@ class TWFEEstimator:
         data: pd.DataFrame,
         outcome: str = 'Abnormal_Return',
         treatment: str = 'Post_Lockup',
-        controls: Optional[list] = None
+        controls: Optional[list] = None,
+        cov_type: str = 'clustered'
     ) -> DiDResult:
-        """Run TWFE DiD regression."""
+        """Run TWFE DiD regression.
+
+        cov_type='clustered' clusters by entity; 'twoway' clusters by entity
+        and date (returns move together on the same market day). Two-way SEs
+        are computed directly from bincount score sums - same numbers as
+        PanelOLS with cluster_entity + cluster_time, without its overhead.
+        """
+        from linearmodels.panel import PanelOLS
+
+        _check_cov_type(cov_type)
         # TODO: Consider bootstrap SEs (clustered might be too conservative)
-        # TODO: Add option for robust vs clustered SEs
         # TODO: Add weights parameter for WLS (tried this, doesn't work well - see scratch notebook)
         # FIXME: Should probably add option to not use time FE (for small samples)
 
@@ -103,6 +153,9 @@ class TWFEEstimator:
         # Tried using WLS with volume weights - made results unstable
         # Unweighted is more conservative anyway
 
+        if cov_type == 'twoway':
+            return self._estimate_twoway(df, outcome, exog_vars)
+
         # Attempted Fama-MacBeth SEs but way too conservative
         # def _fama_macbeth_se(returns, treatment):
         #     # Cross-sectional regression each period, then average coeffs
@@ -148,6 +201,612 @@ class TWFEEstimator:
             estimator='TWFE'
         )
 
+    def jackknife(
+        self,
+        data: pd.DataFrame,
+        outcome: str = 'Abnormal_Return',
+        treatment: str = 'Post_Lockup',
+        controls: Optional[list] = None
+    ) -> 'JackknifeResult':
+        """Leave-one-entity-out coefficients, influence and leverage, without refits.
+
+        Entity effects are nested in the clusters, so sweeping them out
+        first leaves cluster-additive cross-products of [date dummies, X, y].
+        Dropping an IPO subtracts its block; the date-dummy system is
+        downdated with a Woodbury-style solve the size of that IPO's dates,
+        so all leave-one-out fits cost about as much as one full fit.
+        """
+        required = [self.entity_var, self.time_var, outcome, treatment] + list(controls or [])
+        missing = [c for c in required if c not in data.columns]
+        if missing:
+            raise ValueError(f"Missing required columns: {missing}")
+        df = data[required].dropna()
+        if len(df) == 0:
+            raise ValueError("No data left after dropping NAs - check your input data")
+        df = df.sort_values([self.entity_var, self.time_var], kind='stable')
+
+        codes = encode_panel(df, self.entity_var, self.time_var)
+        n_ent, n_times = codes.n_entities, codes.n_times
+        if n_ent < 3:
+            raise ValueError("Need at least 3 entities for a leave-one-out jackknife")
+        entity, time = codes.entity_codes, codes.time_codes
+        offsets = entity_offsets(entity)
+        exog_vars = required[3:]
+        k = len(exog_vars)
+
+        # Entity-demeaned [X, y]
+        raw = df[exog_vars + [outcome]].to_numpy(dtype=float)
+        entity_n = np.bincount(entity, minlength=n_ent).astype(float)
+        wy = raw - (group_sums(raw, entity, n_ent) / entity_n[:, None])[entity]
+        xx_full = wy.T @ wy  # [X, y]'[X, y], entity-demeaned
+
+        # Date dummies (first date is the reference) after entity-demeaning:
+        # A = diag(n_t) - sum_g c_g c_g' / n_g, with c_g = g's date indicators
+        has_dummy = time > 0
+        date_idx = time - 1
+        counts = np.zeros((n_ent, n_times - 1))
+        np.add.at(counts, (entity[has_dummy], date_idx[has_dummy]), 1.0)
+        a = np.diag(counts.sum(axis=0)) - (counts / entity_n[:, None]).T @ counts
+        a_inv = np.linalg.pinv(a)
+        # T'[X, y] (demeaned dummies vs demeaned data = raw dummies vs demeaned data)
+        tw = group_sums(wy[has_dummy], date_idx[has_dummy], n_times - 1)
+        pi = a_inv @ tw
+
+        schur = xx_full - tw.T @ pi  # two-way-demeaned [X, y]'[X, y]
+        xx, xy = schur[:k, :k], schur[:k, k]
+        if np.linalg.matrix_rank(xx) < k:
+            raise RuntimeError("TWFE regression failed: regressors absorbed by the fixed effects.")
+        bread = np.linalg.inv(xx)
+        beta = bread @ xy
+
+        # Fully demeaned rows for scores and leverage
+        row_pi = np.where(has_dummy[:, None], pi[np.maximum(date_idx, 0)], 0.0)
+        twoway = wy - (row_pi - (group_sums(row_pi, entity, n_ent) / entity_n[:, None])[entity])
+        x2, resid = twoway[:, :k], twoway[:, k] - twoway[:, :k] @ beta
+        scores = group_sums(x2 * resid[:, None], entity, n_ent)
+        df_resid = len(df) - k - (n_ent + n_times - 1)
+        cov = _sandwich(bread, scores.T @ scores, len(df) / df_resid)
+
+        loo = np.empty((n_ent, k))
+        leverage = np.empty(n_ent)
+        for g in range(n_ent):
+            rows = slice(offsets[g], offsets[g + 1])
+            wy_g = wy[rows]
+            dummy_rows = has_dummy[rows]
+            j = date_idx[rows][dummy_rows]
+            r_j = wy_g[dummy_rows]  # g's rows of T'[X, y], at its dates
+
+            # (A - U C U')^{-1} R_(g) with U = g's date columns, C = centering / n_g
+            y_loo = pi - a_inv[:, j] @ r_j
+            centering = np.eye(len(j)) - 1.0 / entity_n[g]
+            lhs = np.eye(len(j)) - centering @ a_inv[np.ix_(j, j)]
+            rhs = centering @ y_loo[j]
+            try:
+                w = np.linalg.solve(lhs, rhs)
+            except np.linalg.LinAlgError:
+                # A date only this IPO traded on - its dummy is free without it
+                w = np.linalg.lstsq(lhs, rhs, rcond=None)[0]
+            z = y_loo + a_inv[:, j] @ w
+
+            schur_g = (xx_full - wy_g.T @ wy_g) - (tw.T @ z - r_j.T @ z[j])
+            loo[g] = np.linalg.solve(schur_g[:k, :k], schur_g[:k, k])
+            leverage[g] = np.trace(x2[rows].T @ x2[rows] @ bread)
+
+        coef = loo[:, 0]
+        jk_se = np.sqrt((n_ent - 1) / n_ent * ((coef - coef.mean()) ** 2).sum())
+        se = np.sqrt(cov[0, 0])
+        influence = pd.DataFrame({
+            self.entity_var: codes.entity_labels,
+            'n_obs': entity_n.astype(int),
+            'coefficient_without': coef,
+            'influence': beta[0] - coef,
+            'dfbeta': (beta[0] - coef) / se,
+            'leverage': leverage,
+        })
+        # Rules of thumb: leverage over 3x its average k/G, |DFBETA| > 2/sqrt(G)
+        influence['high_leverage'] = influence['leverage'] > 3 * k / n_ent
+        influence['high_influence'] = influence['dfbeta'].abs() > 2 / np.sqrt(n_ent)
+        influence = influence.reindex(influence['influence'].abs().sort_values(ascending=False).index)
+        flagged = influence['high_leverage'] | influence['high_influence']
+
+        return JackknifeResult(
+            coefficient=beta[0],
+            std_error=se,
+            jackknife_se=jk_se,
+            influence=influence.reset_index(drop=True),
+            flagged=influence.loc[flagged, self.entity_var].tolist()
+        )
+
+    def start_online(
+        self,
+        data: pd.DataFrame,
+        outcome: str = 'Abnormal_Return',
+        treatment: str = 'Post_Lockup',
+        controls: Optional[list] = None,
+        refit_every: int = 20
+    ) -> 'OnlineTWFEState':
+        """Fit once and keep the state for daily updates (entity-clustered SEs)."""
+        state = OnlineTWFEState(outcome, [treatment] + list(controls or []), self.entity_var, self.time_var, refit_every)
+        state.refit(data)
+        return state
+
+    def _estimate_twoway(self, df: pd.DataFrame, outcome: str, exog_vars: List[str]) -> DiDResult:
+        """TWFE with two-way clustered SEs straight from the demeaned arrays."""
+        codes = encode_panel(df, self.entity_var, self.time_var)
+        raw = df[[outcome] + exog_vars].to_numpy(dtype=float)
+        return _fit_coded(codes, raw, 'twoway')
+
+    def estimate_masks(
+        self,
+        data: pd.DataFrame,
+        masks,
+        outcome: str = 'Abnormal_Return',
+        treatment: str = 'Post_Lockup',
+        controls: Optional[list] = None,
+        cov_type: str = 'clustered',
+        max_workers: Optional[int] = None
+    ):
+        """Re-estimate on many subsamples at once, one DiDResult per row mask.
+
+        masks: dict {name: boolean mask} (returns a dict), or a list / 2-D
+        array of masks (returns a list). Each mask is aligned with data's
+        rows, e.g. data['IPO_Date'].dt.year != 2021 or
+        data['Days_Since_IPO'] >= 30. The panel is coded once and every
+        subsample is demeaned exactly on the shared arrays (masked
+        demean_twoway) - no filtered copies, no PanelOLS per mask. Same
+        numbers as estimate(data[mask], cov_type=...), event windows on
+        weakly connected panels included. Subsamples run on a thread
+        pool (numpy does the heavy lifting outside the GIL).
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        _check_cov_type(cov_type)
+        required = [self.entity_var, self.time_var, outcome, treatment] + list(controls or [])
+        missing = [c for c in required if c not in data.columns]
+        if missing:
+            raise ValueError(f"Missing required columns: {missing}")
+
+        names = list(masks) if isinstance(masks, dict) else None
+        mask_list = list(masks.values()) if names is not None else list(masks)
+        mask_matrix = np.array(
+            [m.to_numpy() if isinstance(m, pd.Series) else np.asarray(m) for m in mask_list], dtype=bool
+        ).reshape(len(mask_list), -1)
+        if mask_matrix.shape[1] != len(data):
+            raise ValueError(f"Masks have {mask_matrix.shape[1]} entries, data has {len(data)} rows")
+
+        complete = data[required].notna().all(axis=1).to_numpy()
+        df = data.loc[complete, required]
+        codes = encode_panel(df, self.entity_var, self.time_var)
+        raw = df[[outcome, treatment] + list(controls or [])].to_numpy(dtype=float)
+        mask_matrix = mask_matrix[:, complete]
+
+        def _fit(mask):
+            try:
+                return _fit_coded(codes, raw, cov_type, mask)
+            except (ValueError, RuntimeError, np.linalg.LinAlgError) as e:
+                raise RuntimeError(f"TWFE regression failed on subsample: {str(e)}") from e
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(_fit, mask_matrix))
+        return dict(zip(names, results)) if names is not None else results
+
+
+def _fit_coded(codes, raw: np.ndarray, cov_type: str, mask: Optional[np.ndarray] = None) -> DiDResult:
+    """TWFE on coded arrays ([y, X] columns), optionally restricted to mask rows.
+
+    Entity-clustered (cov_type='clustered') or two-way clustered SEs with
+    PanelOLS's small-sample scaling; the first X column is the treatment.
+    """
+    from scipy import stats
+
+    entity, time = codes.entity_codes, codes.time_codes
+    if mask is None:
+        mask = np.ones(len(raw), dtype=bool)
+    n_obs = int(mask.sum())
+    if n_obs == 0:
+        raise ValueError("Subsample is empty")
+    present_entities = np.bincount(entity[mask], minlength=codes.n_entities) > 0
+    n_entities = int(present_entities.sum())
+    n_times = int((np.bincount(time[mask], minlength=codes.n_times) > 0).sum())
+
+    yx = demean_twoway(raw, entity, time, mask=None if mask.all() else mask)
+    y, x = yx[:, 0], yx[:, 1:]
+    k = x.shape[1]
+
+    xx = x.T @ x
+    if np.linalg.matrix_rank(xx) < k:
+        raise RuntimeError(
+            "TWFE regression failed: regressors absorbed by the fixed effects. Check your panel structure."
+        )
+    bread = np.linalg.inv(xx)
+    beta = bread @ (x.T @ y)
+    resid = np.where(mask, y - x @ beta, 0.0)
+
+    # Same small-sample scaling as PanelOLS (effects counted, debiased)
+    df_resid = n_obs - k - (n_entities + n_times - 1)
+    scores = x * resid[:, None]
+    if cov_type == 'twoway':
+        meat = twoway_cluster_meat(scores, entity, time)
+    else:
+        entity_scores = group_sums(scores, entity, codes.n_entities)
+        meat = entity_scores.T @ entity_scores
+    cov = _sandwich(bread, meat, n_obs / df_resid)
+
+    # Within R^2 the way PanelOLS reports it (entity-demeaned data)
+    w = mask.astype(float)[:, None]
+    entity_counts = np.maximum(np.bincount(entity, weights=w[:, 0], minlength=codes.n_entities), 1.0)[:, None]
+    within = (raw - (group_sums(raw * w, entity, codes.n_entities) / entity_counts)[entity]) * w
+    within_resid = within[:, 0] - within[:, 1:] @ beta
+
+    coef = beta[0]
+    se = np.sqrt(cov[0, 0])
+    return DiDResult(
+        coefficient=coef,
+        std_error=se,
+        t_stat=coef / se,
+        p_value=2 * stats.t.sf(abs(coef / se), df_resid),
+        ci_lower=coef - 1.96 * se,
+        ci_upper=coef + 1.96 * se,
+        n_obs=n_obs,
+        n_entities=n_entities,
+        r_squared=1 - (within_resid @ within_resid) / (within[:, 0] @ within[:, 0]),
+        estimator='TWFE'
+    )
+
+
+class OnlineTWFEState:
+    """Incremental TWFE fit for daily refreshes (see TWFEEstimator.start_online).
+
+    Time-demeaning works date by date, so the normal equations for
+    [entity dummies, X] after sweeping out the date effects are a sum of
+    per-date pieces. Each new trading day adds a diagonal-minus-rank-one
+    term to the entity block plus small K-sized cross-products. The
+    inverse of the entity block is kept up to date with a Woodbury update
+    whose rank is the number of tickers in the new rows, so an update costs
+    O(n_entities^2 x touched tickers) instead of a fresh O(n_entities^3)
+    pseudo-inverse. (The block is singular - entity dummies sum to zero
+    after time-demeaning - so the first entity's effect is pinned to zero;
+    coefficients don't depend on the normalization.)
+
+    Coefficients are exact. Entity-clustered SEs are exact after a
+    (re)fit; update() only adds the new rows' scores (old rows keep the
+    residuals from when they were scored), so refit on the full panel every
+    `refit_every` updates - needs_refit says when.
+    """
+
+    def __init__(
+        self,
+        outcome: str = 'Abnormal_Return',
+        exog_vars: Optional[List[str]] = None,
+        entity_var: str = 'Ticker',
+        time_var: str = 'Date',
+        refit_every: int = 20
+    ):
+        self.outcome = outcome
+        self.exog_vars = list(exog_vars or ['Post_Lockup'])
+        self.entity_var = entity_var
+        self.time_var = time_var
+        self.refit_every = refit_every
+
+        k = len(self.exog_vars)
+        self.entities: List = []
+        self.last_date = None
+        self.n_obs = 0
+        self.n_times = 0
+        self.updates_since_refit = 0
+        # Time-demeaned cross-products of [D, X, y]; dd_inv is the inverse of
+        # dd with entity 0 pinned (pinv of that if the panel is disconnected)
+        self.dd = np.zeros((0, 0))
+        self.dd_inv = np.zeros((0, 0))
+        self.dd_inv_exact = True
+        self._anchored = np.zeros(0, dtype=int)
+        self.dx = np.zeros((0, k))
+        self.dy = np.zeros(0)
+        self.xx = np.zeros((k, k))
+        self.xy = np.zeros(k)
+        # Raw per-entity sums (within R^2) and cluster scores
+        self.entity_n = np.zeros(0)
+        self.entity_x = np.zeros((0, k))
+        self.entity_y = np.zeros(0)
+        self.raw_xx = np.zeros((k, k))
+        self.raw_xy = np.zeros(k)
+        self.raw_yy = 0.0
+        self.scores = np.zeros((0, k))
+
+    @property
+    def needs_refit(self) -> bool:
+        return self.updates_since_refit >= self.refit_every
+
+    def _prepare(self, data: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        required = [self.entity_var, self.time_var, self.outcome] + self.exog_vars
+        missing = [c for c in required if c not in data.columns]
+        if missing:
+            raise ValueError(f"Missing required columns: {missing}")
+        df = data[required].dropna()
+        if len(df) == 0:
+            raise ValueError("No data left after dropping NAs - check your input data")
+
+        dates = pd.DatetimeIndex(df[self.time_var])
+        if self.last_date is not None and dates.min() <= self.last_date:
+            raise ValueError(
+                f"Rows dated on or before {self.last_date.date()} are already folded in - use refit() for revisions"
+            )
+
+        # New tickers get appended to the entity index
+        labels = pd.Index(self.entities)
+        new_labels = pd.Index(df[self.entity_var].unique()).difference(labels)
+        if len(new_labels):
+            self._grow(len(new_labels))
+            self.entities.extend(new_labels.tolist())
+        entity = pd.Index(self.entities).get_indexer(df[self.entity_var])
+        time_codes, time_labels = pd.factorize(dates, sort=True)
+        self.last_date = time_labels.max()
+        self.n_times += len(time_labels)
+        return entity, time_codes, df[self.exog_vars].to_numpy(dtype=float), df[self.outcome].to_numpy(dtype=float)
+
+    def _grow(self, n_new: int):
+        k = len(self.exog_vars)
+        g = len(self.entities)
+        dd = np.zeros((g + n_new, g + n_new))
+        dd[:g, :g] = self.dd
+        self.dd = dd
+        # New entities start with a unit anchor (identity block in the
+        # inverse); _fold takes it out again once their rows are in
+        dd_inv = np.eye(g + n_new)
+        dd_inv[:g, :g] = self.dd_inv
+        self.dd_inv = dd_inv
+        self._anchored = np.r_[self._anchored, np.arange(g, g + n_new)]
+        self.dx = np.vstack([self.dx, np.zeros((n_new, k))])
+        self.dy = np.r_[self.dy, np.zeros(n_new)]
+        self.entity_n = np.r_[self.entity_n, np.zeros(n_new)]
+        self.entity_x = np.vstack([self.entity_x, np.zeros((n_new, k))])
+        self.entity_y = np.r_[self.entity_y, np.zeros(n_new)]
+        self.scores = np.vstack([self.scores, np.zeros((n_new, k))])
+
+    def _fold(self, entity, time_codes, x, y):
+        """Add the time-demeaned cross-products of whole new dates."""
+        n_dates = time_codes.max() + 1
+        date_n = np.bincount(time_codes, minlength=n_dates).astype(float)
+        x_bar = group_sums(x, time_codes, n_dates) / date_n[:, None]
+        y_bar = group_sums(y, time_codes, n_dates) / date_n
+
+        # Only the tickers in the new rows are touched: local codes 0..m-1
+        touched, local = np.unique(entity, return_inverse=True)
+        m = len(touched)
+        counts = np.bincount(time_codes * m + local, minlength=n_dates * m).reshape(n_dates, m).astype(float)
+        entity_n = counts.sum(axis=0)
+        entity_x = group_sums(x, local, m)
+        entity_y = np.bincount(local, weights=y, minlength=m)
+
+        # Sum over dates of (D - D_bar)'(D - D_bar) = diag(counts) - c c' / n
+        delta = np.diag(entity_n) - (counts / date_n[:, None]).T @ counts
+        self.dd[np.ix_(touched, touched)] += delta
+        self.dx[touched] += entity_x - counts.T @ x_bar
+        self.dy[touched] += entity_y - counts.T @ y_bar
+        self.xx += x.T @ x - (x_bar * date_n[:, None]).T @ x_bar
+        self.xy += x.T @ y - (x_bar * date_n[:, None]).T @ y_bar
+        self._update_inverse(touched, delta)
+
+        self.entity_n[touched] += entity_n
+        self.entity_x[touched] += entity_x
+        self.entity_y[touched] += entity_y
+        self.raw_xx += x.T @ x
+        self.raw_xy += x.T @ y
+        self.raw_yy += y @ y
+        self.n_obs += len(y)
+
+    def _update_inverse(self, touched: np.ndarray, delta: np.ndarray):
+        """dd_inv after adding delta on the touched block (Woodbury, rank len(touched)).
+
+        Temporary anchors of newly added entities come out in the same step;
+        entity 0 (the first one ever seen) keeps its anchor as the pin.
+        """
+        # Entity 0 is the permanent pin, not a temporary anchor
+        temp = np.isin(touched, self._anchored[self._anchored != 0])
+        self._anchored = np.zeros(0, dtype=int)
+
+        if self.dd_inv_exact:
+            k = delta - np.diag(temp.astype(float))
+            a_u = self.dd_inv[:, touched]
+            capacitance = np.eye(len(touched)) + k @ a_u[touched]
+            if np.linalg.cond(capacitance) < 1e10:
+                self.dd_inv -= a_u @ np.linalg.solve(capacitance, k @ a_u.T)
+                return
+        # Disconnected entity-date graph (or a near-singular update): fall back
+        # to a full pseudo-inverse until the panel connects again
+        pinned = self.dd.copy()
+        pinned[0, 0] += 1.0
+        self.dd_inv = np.linalg.pinv(pinned)
+        self.dd_inv_exact = bool(np.linalg.matrix_rank(pinned) == len(pinned))
+
+    def _solve(self) -> Dict:
+        dd_inv = self.dd_inv
+        pi = dd_inv @ self.dx  # entity part of the two-way projection of X
+        xx_within = self.xx - self.dx.T @ pi
+        if np.linalg.matrix_rank(xx_within) < len(self.exog_vars):
+            raise RuntimeError("TWFE regression failed: regressors absorbed by the fixed effects.")
+        bread = np.linalg.inv(xx_within)
+        beta = bread @ (self.xy - self.dx.T @ (dd_inv @ self.dy))
+        alpha = dd_inv @ (self.dy - self.dx @ beta)
+        return {'beta': beta, 'bread': bread, 'alpha': alpha, 'pi': pi}
+
+    def _add_scores(self, fit: Dict, entity, time_codes, x, y):
+        """Entity score sums x_tilde * u for rows of whole dates, at the current fit."""
+        n_dates = time_codes.max() + 1
+        date_n = np.bincount(time_codes, minlength=n_dates).astype(float)[:, None]
+        x_rem = x - fit['pi'][entity]
+        u_rem = y - fit['alpha'][entity] - x @ fit['beta']
+        # Date effects are date means of what's left after the entity effects
+        x_tilde = x_rem - (group_sums(x_rem, time_codes, n_dates) / date_n)[time_codes]
+        u = u_rem - (np.bincount(time_codes, weights=u_rem, minlength=n_dates) / date_n[:, 0])[time_codes]
+        self.scores += group_sums(x_tilde * u[:, None], entity, len(self.entities))
+
+    def update(self, new_rows: pd.DataFrame) -> DiDResult:
+        """Fold in rows for new trading days (all dates after the last one seen).
+
+        Works on a copy and only keeps it if the fit succeeds, so a bad
+        batch leaves the state as it was.
+        """
+        staged = copy.deepcopy(self)
+        entity, time_codes, x, y = staged._prepare(new_rows)
+        staged._fold(entity, time_codes, x, y)
+        fit = staged._solve()
+        staged._add_scores(fit, entity, time_codes, x, y)
+        staged.updates_since_refit += 1
+        self.__dict__.update(staged.__dict__)
+        return self._result(fit)
+
+    def refit(self, data: pd.DataFrame) -> DiDResult:
+        """Rebuild from the full panel (exact SEs again); resets needs_refit."""
+        fresh = OnlineTWFEState(self.outcome, self.exog_vars, self.entity_var, self.time_var, self.refit_every)
+        entity, time_codes, x, y = fresh._prepare(data)
+        fresh._fold(entity, time_codes, x, y)
+        fit = fresh._solve()
+        fresh._add_scores(fit, entity, time_codes, x, y)
+        self.__dict__.update(fresh.__dict__)
+        return self._result(fit)
+
+    def result(self) -> DiDResult:
+        """Current estimate (no new data)."""
+        return self._result(self._solve())
+
+    def _result(self, fit: Dict) -> DiDResult:
+        from scipy import stats
+
+        k = len(self.exog_vars)
+        beta, bread = fit['beta'], fit['bread']
+        # Same small-sample scaling as PanelOLS (effects counted, debiased)
+        df_resid = self.n_obs - k - (len(self.entities) + self.n_times - 1)
+        cov = _sandwich(bread, self.scores.T @ self.scores, self.n_obs / df_resid)
+
+        # Within R^2 the way PanelOLS reports it (entity-demeaned data)
+        n = np.maximum(self.entity_n, 1.0)
+        yy_e = self.raw_yy - (self.entity_y ** 2 / n).sum()
+        xy_e = self.raw_xy - self.entity_x.T @ (self.entity_y / n)
+        xx_e = self.raw_xx - (self.entity_x / n[:, None]).T @ self.entity_x
+        ssr_e = yy_e - 2 * beta @ xy_e + beta @ xx_e @ beta
+
+        coef = beta[0]
+        se = np.sqrt(cov[0, 0])
+        return DiDResult(
+            coefficient=coef,
+            std_error=se,
+            t_stat=coef / se,
+            p_value=2 * stats.t.sf(abs(coef / se), df_resid),
+            ci_lower=coef - 1.96 * se,
+            ci_upper=coef + 1.96 * se,
+            n_obs=self.n_obs,
+            n_entities=len(self.entities),
+            r_squared=1 - ssr_e / yy_e,
+            estimator='TWFE (online)'
+        )
+
+    def save(self, path) -> None:
+        """Persist the accumulated sums (npz) so tomorrow's refresh can pick up from here."""
+        arrays = {k: v for k, v in self.__dict__.items() if isinstance(v, np.ndarray)}
+        meta = {
+            'outcome': self.outcome, 'exog_vars': self.exog_vars,
+            'entity_var': self.entity_var, 'time_var': self.time_var,
+            'refit_every': self.refit_every, 'entities': [str(e) for e in self.entities],
+            'last_date': None if self.last_date is None else str(self.last_date),
+            'n_obs': self.n_obs, 'n_times': self.n_times,
+            'updates_since_refit': self.updates_since_refit, 'raw_yy': self.raw_yy,
+            'dd_inv_exact': self.dd_inv_exact,
+        }
+        np.savez(path, meta=np.array(json.dumps(meta)), **arrays)
+
+    @classmethod
+    def load(cls, path) -> 'OnlineTWFEState':
+        with np.load(path) as f:
+            meta = json.loads(str(f['meta']))
+            arrays = {k: f[k] for k in f.files if k != 'meta'}
+        state = cls(meta['outcome'], meta['exog_vars'], meta['entity_var'], meta['time_var'], meta['refit_every'])
+        state.__dict__.update(arrays)
+        state.entities = meta['entities']
+        state.last_date = None if meta['last_date'] is None else pd.Timestamp(meta['last_date'])
+        state.n_obs, state.n_times = meta['n_obs'], meta['n_times']
+        state.updates_since_refit = meta['updates_since_refit']
+        state.raw_yy = meta['raw_yy']
+        state.dd_inv_exact = meta['dd_inv_exact']
+        return state
+
+
+def _event_time_is_separable(
+    entity_codes: np.ndarray,
+    time_codes: np.ndarray,
+    event_time: np.ndarray
+) -> bool:
+    """Check whether event time splits exactly into a date part minus an entity part.
+
+    If event_time = a[date] - b[entity] on every row, the sum of k * event_k
+    dummies lies in the span of the two-way FE, so one more dummy is collinear.
+    That's always the case when event time is counted from a per-IPO date.
+    """
+    n_entities = entity_codes.max() + 1
+    n_times = time_codes.max() + 1
+    b = np.full(n_entities, np.nan)
+    a = np.full(n_times, np.nan)
+
+    # Propagate offsets across the entity-date graph, one component at a time
+    while np.isnan(b).any():
+        b[np.flatnonzero(np.isnan(b))[0]] = 0.0
+        while True:
+            rows = ~np.isnan(b[entity_codes]) & np.isnan(a[time_codes])
+            a[time_codes[rows]] = event_time[rows] + b[entity_codes[rows]]
+            rows_b = np.isnan(b[entity_codes]) & ~np.isnan(a[time_codes])
+            b[entity_codes[rows_b]] = a[time_codes[rows_b]] - event_time[rows_b]
+            if not rows.any() and not rows_b.any():
+                break
+
+    return bool(np.allclose(a[time_codes] - b[entity_codes], event_time))
+
+
+def _find_absorbed_event_times(
+    df: pd.DataFrame,
+    entity_var: str,
+    time_var: str,
+    event_time_var: str,
+    event_times: List,
+    omit_period: int
+) -> List:
+    """Work out which event-time dummies the two-way FE will absorb.
+
+    Uses the event-time x calendar-time (and x entity) incidence counts
+    instead of a rank check on the demeaned design:
+    - event_k is absorbed by time FE if every date where k shows up has only k
+    - same thing for entity FE (entity only observed at k inside the window)
+    - if the omitted period isn't in the window, the dummies sum to one
+    - if event time is separable (date part - entity part), the linear trend
+      in event time is collinear too (no never-treated units)
+    Each of the last two costs one more dummy - drop the latest remaining,
+    which is what PanelOLS(drop_absorbed=True) picks (its QR is unpivoted, so
+    the last column of a collinear set is the one that comes out zero).
+    """
+    event_time = df[event_time_var].to_numpy()
+    entity_codes = pd.factorize(df[entity_var])[0]
+    time_codes = pd.factorize(df[time_var])[0]
+    k_codes, k_values = pd.factorize(event_time)
+    n_k = len(k_values)
+
+    absorbed = set()
+    for codes in (time_codes, entity_codes):
+        # (group, event time) incidence; k is absorbed if every group that
+        # has k has nothing else
+        n_groups = codes.max() + 1
+        counts = np.bincount(codes * n_k + k_codes, minlength=n_groups * n_k).reshape(n_groups, n_k)
+        totals = counts.sum(axis=1, keepdims=True)
+        only_k = ((counts == 0) | (counts == totals)).all(axis=0)
+        absorbed.update(k_values[only_k].tolist())
+    absorbed &= set(event_times)
+
+    n_extra = int(omit_period not in set(k_values.tolist()))
+    n_extra += int(_event_time_is_separable(entity_codes, time_codes, event_time.astype(float)))
+    remaining = [t for t in event_times if t not in absorbed]
+    if n_extra:
+        absorbed.update(remaining[-n_extra:])
+
+    return [t for t in event_times if t in absorbed]
+
 
 class EventStudyEstimator:
     """Event study with dynamic treatment effects by period."""
@@ -168,9 +827,28 @@ class EventStudyEstimator:
         outcome: str = 'Abnormal_Return',
         pre_window: int = 30,
         post_window: int = 30,
-        omit_period: int = -1
+        omit_period: int = -1,
+        bins: Optional[List[int]] = None,
+        cov_type: str = 'clustered'
     ) -> pd.DataFrame:
-        """Estimate event study coefficients."""
+        """Estimate event study coefficients.
+
+        Pass bin edges (e.g. [-30, -20, -10, 0, 10, 20, 30]) to get binned
+        coefficients instead of one per day - see estimate_binned.
+        cov_type='twoway' clusters by entity and date; all coefficients'
+        SEs come from one set of bincount score sums (no PanelOLS refit).
+        Dummies collinear with the FE are dropped as PanelOLS(drop_absorbed=True)
+        would - without never-treated firms that's the last post period - and
+        flagged in the 'absorbed' column.
+        """
+        _check_cov_type(cov_type)
+        if bins is not None:
+            moments = self.compute_moments(data, outcome, pre_window, post_window, omit_period, cov_type)
+            return self.estimate_binned(moments, bins)
+
+        from linearmodels.panel import PanelOLS
+        from linearmodels.panel.utility import AbsorbingEffectError
+
         # Check event time variable exists
         if self.event_time_var not in data.columns:
             raise ValueError(f"Event time variable '{self.event_time_var}' not found in data")
@@ -188,58 +866,93 @@ class EventStudyEstimator:
         event_times = [t for t in event_times if t != omit_period]
         # print(f"DEBUG: Creating dummies for {len(event_times)} event periods")
 
-        # TODO: Add option to bin event times (eg -30 to -20, -20 to -10, etc) for cleaner plots
-        # TODO: Return absorbed variable list so user knows which periods got dropped
-
         if len(event_times) == 0:
             raise ValueError(f"No event time periods found (omit_period={omit_period})")
 
-        for t in event_times:
+        # Figure out absorbed periods up front so PanelOLS doesn't have to
+        # (drop_absorbed=True does an eigen-decomposition of the full design)
+        absorbed = _find_absorbed_event_times(
+            df, self.entity_var, self.time_var, self.event_time_var, event_times, omit_period
+        )
+        kept_times = [t for t in event_times if t not in absorbed]
+
+        for t in kept_times:
             df[f'event_{t}'] = (df[self.event_time_var] == t).astype(int)
 
         # Set up panel
         df_panel = df.set_index([self.entity_var, self.time_var])
 
         # Run regression with event time dummies
-        dummy_vars = [f'event_{t}' for t in event_times]
+        dummy_vars = [f'event_{t}' for t in kept_times]
 
-        # NOTE: drop_absorbed=True needed because time FE + event dummies create collinearity
-        # Some coefficients will be absorbed - that's expected
-        try:
-            with warnings.catch_warnings():
-                warnings.simplefilter("ignore")
-                model = PanelOLS(
-                    dependent=df_panel[outcome],
-                    exog=df_panel[dummy_vars],
-                    entity_effects=True,
-                    time_effects=True,
-                    drop_absorbed=True,  # Critical for avoiding collinearity issues
-                    check_rank=False
-                )
-                results = model.fit(cov_type='clustered', cluster_entity=True)
-        except Exception as e:
-            # Ugh, this happens when FE absorb everything. Usually means data issue.
-            raise RuntimeError(f"Event study regression failed: {str(e)}") from e
+        params = pd.Series(dtype=float)
+        std_errors = pd.Series(dtype=float)
+        pvalues = pd.Series(dtype=float)
+        param_cov = pd.DataFrame(dtype=float)
+        if dummy_vars and cov_type == 'twoway':
+            moments = self.compute_moments(df, outcome, pre_window, post_window, omit_period, cov_type)
+            agg = (np.array(moments.event_times)[:, None] == np.array(kept_times)[None, :]).astype(float)
+            kept, beta, se, pv, cov = self._fit_moments(moments, agg)
+            names = [dummy_vars[j] for j in kept]
+            params = pd.Series(beta, index=names, dtype=float)
+            std_errors = pd.Series(se, index=names, dtype=float)
+            pvalues = pd.Series(pv, index=names, dtype=float)
+            param_cov = pd.DataFrame(cov, index=names, columns=names)
+            absorbed = [t for t in event_times if f'event_{t}' not in params.index]
+        elif dummy_vars:
+            try:
+                with warnings.catch_warnings():
+                    warnings.simplefilter("ignore")
+                    try:
+                        model = PanelOLS(
+                            dependent=df_panel[outcome],
+                            exog=df_panel[dummy_vars],
+                            entity_effects=True,
+                            time_effects=True,
+                            check_rank=False
+                        )
+                        results = model.fit(cov_type='clustered', cluster_entity=True)
+                    except AbsorbingEffectError:
+                        # Pre-pass missed a collinearity (odd panel shape) - fall back
+                        # to letting PanelOLS find it
+                        model = PanelOLS(
+                            dependent=df_panel[outcome],
+                            exog=df_panel[dummy_vars],
+                            entity_effects=True,
+                            time_effects=True,
+                            drop_absorbed=True,
+                            check_rank=False
+                        )
+                        results = model.fit(cov_type='clustered', cluster_entity=True)
+            except Exception as e:
+                # Ugh, this happens when FE absorb everything. Usually means data issue.
+                raise RuntimeError(f"Event study regression failed: {str(e)}") from e
+
+            params = results.params
+            std_errors = results.std_errors
+            pvalues = results.pvalues
+            param_cov = results.cov
+            absorbed = [t for t in event_times if f'event_{t}' not in params.index]
 
-        # Extract coefficients (skip ones that got absorbed by FE)
-        # NOTE: Some vars will be absorbed - that's expected with time FE
+        # Absorbed periods get NaN coefficients (flagged in 'absorbed' column)
         coeffs = []
         for t in event_times:
             var_name = f'event_{t}'
-            if var_name in results.params.index:
+            if var_name in params.index:
                 coeffs.append({
                     'event_time': t,
-                    'coefficient': results.params[var_name],
-                    'std_error': results.std_errors[var_name],
-                    'p_value': results.pvalues[var_name]
+                    'coefficient': params[var_name],
+                    'std_error': std_errors[var_name],
+                    'p_value': pvalues[var_name],
+                    'absorbed': False
                 })
             else:
-                # Variable was absorbed by fixed effects
                 coeffs.append({
                     'event_time': t,
                     'coefficient': np.nan,
                     'std_error': np.nan,
-                    'p_value': np.nan
+                    'p_value': np.nan,
+                    'absorbed': True
                 })
 
         # Add omitted period
@@ -247,16 +960,309 @@ class EventStudyEstimator:
             'event_time': omit_period,
             'coefficient': 0.0,
             'std_error': 0.0,
-            'p_value': np.nan
+            'p_value': np.nan,
+            'absorbed': False
         })
 
         df_coeffs = pd.DataFrame(coeffs).sort_values('event_time')
         df_coeffs['ci_lower'] = df_coeffs['coefficient'] - 1.96 * df_coeffs['std_error']
         df_coeffs['ci_upper'] = df_coeffs['coefficient'] + 1.96 * df_coeffs['std_error']
+        df_coeffs.attrs['absorbed_periods'] = absorbed
+        # Full covariance of the estimated coefficients (for honest_did). Plain
+        # lists - DataFrames in attrs break pd.concat's attrs comparison
+        df_coeffs.attrs['cov'] = {
+            'periods': [int(name[len('event_'):]) for name in param_cov.index],
+            'matrix': param_cov.to_numpy().tolist()
+        }
+
+        return df_coeffs
+
+    def compute_moments(
+        self,
+        data: pd.DataFrame,
+        outcome: str = 'Abnormal_Return',
+        pre_window: int = 30,
+        post_window: int = 30,
+        omit_period: int = -1,
+        cov_type: str = 'clustered'
+    ) -> 'EventStudyMoments':
+        """Demean the daily event dummies once and keep their cross-products.
+
+        Any binning of event days is a linear map of the daily dummies, so
+        binned fits only need these (plus per-firm pieces for clustered SEs).
+        Two-way clustering needs observation-level scores, so with
+        cov_type='twoway' the demeaned arrays are kept instead.
+        """
+        _check_cov_type(cov_type)
+        if self.event_time_var not in data.columns:
+            raise ValueError(f"Event time variable '{self.event_time_var}' not found in data")
+
+        df = data[data[self.event_time_var].between(-pre_window, post_window)]
+        df = df[[self.entity_var, self.time_var, self.event_time_var, outcome]].dropna()
+
+        if len(df) == 0:
+            raise ValueError(f"No data in event window [{-pre_window}, {post_window}] - check your event_time_var")
+
+        event_times = sorted(t for t in df[self.event_time_var].unique() if t != omit_period)
+        if len(event_times) == 0:
+            raise ValueError(f"No event time periods found (omit_period={omit_period})")
+
+        codes = encode_panel(df, self.entity_var, self.time_var)
+        day_idx = pd.Index(event_times).get_indexer(df[self.event_time_var])
+        dummies = np.zeros((len(df), len(event_times)))
+        in_model = day_idx >= 0
+        dummies[np.flatnonzero(in_model), day_idx[in_model]] = 1.0
+
+        yx = demean_twoway(
+            np.column_stack([df[outcome].to_numpy(dtype=float), dummies]),
+            codes.entity_codes,
+            codes.time_codes
+        )
+        y, x = yx[:, 0], yx[:, 1:]
+
+        moments = EventStudyMoments(
+            event_times=event_times,
+            omit_period=omit_period,
+            xx=x.T @ x,
+            xy=x.T @ y,
+            n_obs=len(df),
+            n_entities=codes.n_entities,
+            n_times=codes.n_times,
+            cov_type=cov_type
+        )
+        # Row incidence, so binned fits can work out absorbed bins (see estimate_binned)
+        moments.entity_codes, moments.time_codes, moments.day_idx = codes.entity_codes, codes.time_codes, day_idx
+        if cov_type == 'twoway':
+            moments.x, moments.y = x, y
+            return moments
+
+        # Per-firm cross-products for the clustered sandwich
+        order = np.argsort(codes.entity_codes, kind='stable')
+        bounds = np.r_[0, np.cumsum(np.bincount(codes.entity_codes))]
+        xx_cluster = np.empty((codes.n_entities, len(event_times), len(event_times)))
+        xy_cluster = np.empty((codes.n_entities, len(event_times)))
+        for g in range(codes.n_entities):
+            rows = order[bounds[g]:bounds[g + 1]]
+            xx_cluster[g] = x[rows].T @ x[rows]
+            xy_cluster[g] = x[rows].T @ y[rows]
+        moments.xx_cluster, moments.xy_cluster = xx_cluster, xy_cluster
+        return moments
+
+    def _fit_moments(
+        self,
+        moments: 'EventStudyMoments',
+        agg: np.ndarray,
+        absorbed: Sequence[int] = ()
+    ) -> Tuple[List[int], np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Fit on the regressors daily dummies @ agg; returns (kept columns, beta, se, p-values, cov).
+
+        absorbed lists the agg columns the FE absorb (from incidence, see
+        _find_absorbed_event_times). If the rest is still rank deficient
+        (odd panel shape), a greedy rank check on the (small) Gram drops the
+        later columns of a collinear set - same choice as
+        PanelOLS(drop_absorbed=True).
+        """
+        from scipy import stats
+
+        xx = agg.T @ moments.xx @ agg
+        xy = agg.T @ moments.xy
+
+        kept = [j for j in range(agg.shape[1]) if j not in set(absorbed)]
+        if kept and np.linalg.matrix_rank(xx[np.ix_(kept, kept)]) < len(kept):
+            candidates, kept = kept, []
+            diag_scale = max(np.diag(xx).max(), 1e-300)
+            for j in candidates:
+                resid = xx[j, j]
+                if kept:
+                    resid -= xx[j, kept] @ np.linalg.solve(xx[np.ix_(kept, kept)], xx[kept, j])
+                if resid > 1e-9 * diag_scale:
+                    kept.append(j)
+        if not kept:
+            return kept, np.empty(0), np.empty(0), np.empty(0), np.empty((0, 0))
+
+        agg_k = agg[:, kept]
+        bread = np.linalg.inv(xx[np.ix_(kept, kept)])
+        beta = bread @ xy[kept]
+
+        if moments.cov_type == 'twoway':
+            x = moments.x @ agg_k
+            scores = x * (moments.y - x @ beta)[:, None]
+            meat = twoway_cluster_meat(scores, moments.entity_codes, moments.time_codes)
+        else:
+            # Cluster scores: X_g'u_g = X_g'y_g - X_g'X_g A b
+            scores = (moments.xy_cluster - moments.xx_cluster @ (agg_k @ beta)) @ agg_k
+            meat = scores.T @ scores
+
+        # Same small-sample scaling as PanelOLS (effects counted, debiased)
+        df_resid = moments.n_obs - len(kept) - moments.extra_df
+        cov = _sandwich(bread, meat, moments.n_obs / df_resid)
+        se = np.sqrt(np.diag(cov))
+        pvalues = 2 * stats.t.sf(np.abs(beta / se), df_resid)
+        return kept, beta, se, pvalues, cov
+
+    def estimate_binned(self, moments: 'EventStudyMoments', bins: List[int]) -> pd.DataFrame:
+        """Binned event study from cached moments (no refit).
+
+        Bins are [edge_i, edge_i+1), last one closed. The bin holding
+        omit_period is the reference, and days outside the edges are pooled
+        into it too. Matches running PanelOLS on bin dummies (clustered SEs
+        by entity, or entity + date for moments built with cov_type='twoway').
+        """
+        edges = np.asarray(sorted(bins))
+        if len(edges) < 2:
+            raise ValueError("Need at least two bin edges")
+
+        def _bin_of(t):
+            if t < edges[0] or t > edges[-1]:
+                return -1
+            return min(int(np.searchsorted(edges, t, side='right')) - 1, len(edges) - 2)
+
+        ref_bin = _bin_of(moments.omit_period)
+        day_bins = np.array([_bin_of(t) for t in moments.event_times])
+        bin_ids = [j for j in range(len(edges) - 1) if j != ref_bin and (day_bins == j).any()]
+
+        # Absorbed bins from the (entity, date, bin) incidence, as for daily dummies.
+        # Rows are labelled by bin start (so one-day bins are the days themselves);
+        # the omitted day and days outside the edges share the reference label
+        ref_label = edges[ref_bin] if ref_bin >= 0 else moments.omit_period
+        row_bins = np.where(moments.day_idx >= 0, day_bins[moments.day_idx], ref_bin)
+        bin_labels = [edges[j] for j in bin_ids]
+        incidence = pd.DataFrame({
+            'entity': moments.entity_codes,
+            'time': moments.time_codes,
+            'bin': np.where(row_bins >= 0, edges[np.maximum(row_bins, 0)], ref_label),
+        })
+        absorbed = _find_absorbed_event_times(incidence, 'entity', 'time', 'bin', bin_labels, ref_label)
+
+        # Map days -> bins, then project the cached moments
+        agg = (day_bins[:, None] == np.array(bin_ids)[None, :]).astype(float)
+        kept, beta, se, pvalues, cov = self._fit_moments(
+            moments, agg, absorbed=[j for j, label in enumerate(bin_labels) if label in set(absorbed)]
+        )
+        names = [bin_ids[j] for j in kept]
+        params = pd.Series(beta, index=names, dtype=float)
+        std_errors = pd.Series(se, index=names, dtype=float)
+        pvalues = pd.Series(pvalues, index=names, dtype=float)
+
+        coeffs = []
+        for j in range(len(edges) - 1):
+            absorbed = j != ref_bin and j not in params.index
+            coeffs.append({
+                'bin_start': edges[j],
+                'bin_end': edges[j + 1],
+                'coefficient': 0.0 if j == ref_bin else params.get(j, np.nan),
+                'std_error': 0.0 if j == ref_bin else std_errors.get(j, np.nan),
+                'p_value': pvalues.get(j, np.nan),
+                'absorbed': absorbed
+            })
+
+        df_coeffs = pd.DataFrame(coeffs)
+        df_coeffs['ci_lower'] = df_coeffs['coefficient'] - 1.96 * df_coeffs['std_error']
+        df_coeffs['ci_upper'] = df_coeffs['coefficient'] + 1.96 * df_coeffs['std_error']
+        df_coeffs.attrs['absorbed_periods'] = df_coeffs.loc[df_coeffs['absorbed'], 'bin_start'].tolist()
+        df_coeffs.attrs['cov'] = {'periods': [int(edges[j]) for j in names], 'matrix': cov.tolist()}
 
         return df_coeffs
 
 
+@dataclass
+class EventStudyMoments:
+    """Demeaned cross-products of the daily event dummies (see compute_moments)."""
+    event_times: List
+    omit_period: int
+    xx: np.ndarray  # K x K, summed over firms
+    xy: np.ndarray  # K
+    n_obs: int
+    n_entities: int
+    n_times: int
+    cov_type: str = 'clustered'
+    xx_cluster: Optional[np.ndarray] = None  # G x K x K, per firm ('clustered')
+    xy_cluster: Optional[np.ndarray] = None  # G x K
+    x: Optional[np.ndarray] = None  # N x K demeaned dummies ('twoway')
+    y: Optional[np.ndarray] = None  # N
+    entity_codes: Optional[np.ndarray] = None  # N
+    time_codes: Optional[np.ndarray] = None  # N
+    day_idx: Optional[np.ndarray] = None  # N, position in event_times (-1 = omitted day)
+
+    @property
+    def extra_df(self) -> int:
+        """Fixed effects PanelOLS counts against the residual dof."""
+        return self.n_entities + self.n_times - 1
+
+
+def per_entity_lockup_effects(
+    data: pd.DataFrame,
+    outcome: str = 'Abnormal_Return',
+    treatment: str = 'Post_Lockup',
+    entity_var: str = 'Ticker',
+    time_var: str = 'Date',
+    window: Optional[int] = None,
+    event_time_var: str = 'Days_To_Lockup'
+) -> pd.DataFrame:
+    """Post- minus pre-lockup mean return for every IPO, ranked.
+
+    One pass over the (entity, date)-sorted panel: per-entity sums, sums of
+    squares and counts come from segment sums at the entity offsets, so all
+    tickers are done at once instead of one regression each. SEs are Welch
+    (unequal variances), p-values use Welch-Satterthwaite dof.
+    window limits to |event time| <= window days around the lockup.
+    """
+    from scipy import stats
+
+    required = [entity_var, time_var, outcome, treatment]
+    if window is not None:
+        required.append(event_time_var)
+    missing = [c for c in required if c not in data.columns]
+    if missing:
+        raise ValueError(f"Missing required columns: {missing}")
+
+    df = data[required].dropna()
+    if window is not None:
+        df = df[df[event_time_var].between(-window, window)]
+    if len(df) == 0:
+        raise ValueError("No data left after dropping NAs - check your input data")
+
+    # Cheap no-op when the panel came from prepare_panel_data
+    df = df.sort_values([entity_var, time_var], kind='stable')
+    codes = encode_panel(df, entity_var, time_var)
+    offsets = entity_offsets(codes.entity_codes)
+
+    y = df[outcome].to_numpy(dtype=float)
+    post = (df[treatment].to_numpy() > 0).astype(float)
+    pre = 1.0 - post
+    sums = segment_sums(np.column_stack([pre, post, y * pre, y * post, y ** 2 * pre, y ** 2 * post]), offsets)
+    n_pre, n_post = sums[:, 0], sums[:, 1]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_pre, mean_post = sums[:, 2] / n_pre, sums[:, 3] / n_post
+        var_pre = (sums[:, 4] - n_pre * mean_pre ** 2) / (n_pre - 1)
+        var_post = (sums[:, 5] - n_post * mean_post ** 2) / (n_post - 1)
+        var_pre = np.where(n_pre > 1, np.maximum(var_pre, 0.0), np.nan)
+        var_post = np.where(n_post > 1, np.maximum(var_post, 0.0), np.nan)
+
+        coef = mean_post - mean_pre
+        a, b = var_pre / n_pre, var_post / n_post
+        se = np.sqrt(a + b)
+        t_stat = coef / se
+        dof = (a + b) ** 2 / (a ** 2 / (n_pre - 1) + b ** 2 / (n_post - 1))
+    p_val = 2 * stats.t.sf(np.abs(t_stat), dof)
+
+    results = pd.DataFrame({
+        entity_var: codes.entity_labels,
+        'coefficient': coef,
+        'std_error': se,
+        't_stat': t_stat,
+        'p_value': p_val,
+        'ci_lower': coef - 1.96 * se,
+        'ci_upper': coef + 1.96 * se,
+        'n_pre': n_pre.astype(int),
+        'n_post': n_post.astype(int),
+    })
+    results = results.sort_values('coefficient', ascending=False, na_position='last').reset_index(drop=True)
+    results.insert(0, 'rank', np.arange(1, len(results) + 1))
+    return results
+
+
 def test_parallel_trends(
     data: pd.DataFrame,
     outcome: str = 'Abnormal_Return',
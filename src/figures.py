@@ -0,0 +1,266 @@
+"""
+Headless figure rendering from the results registry.
+
+Figures used to come out of the notebooks, which meant re-estimating
+everything to redraw a chart. Here each figure is a query on the registry
+plus a plotting function; figures render in a process pool and are skipped
+when their input rows and style haven't changed since the last render.
+
+Only figures backed by registry results live here - the raw-data plots
+(parallel trends averages, RDD illustration) still come from the
+notebooks. The robustness and Goodman-Bacon inputs are recorded by
+`run_analysis.py --robustness` (see robustness.py).
+"""
+import hashlib
+import json
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from .results_registry import ResultsRegistry, RESULT_COLUMNS
+
+
+# Same look as the notebook charts
+DEFAULT_STYLE = {
+    'template': 'plotly_white',
+    'height': 500,
+    'scale': 2,
+    'line_color': '#2E86AB',
+    'ci_fill': 'rgba(46, 134, 171, 0.2)',
+    'significant_color': 'green',
+    'insignificant_color': 'gray',
+    'highlight_color': 'red',
+    'placebo_color': 'lightgray',
+}
+
+CACHE_FILE = '.figures_cache.json'
+
+
+@dataclass
+class FigureSpec:
+    """One output figure: which registry rows it needs and how to draw them."""
+    filename: str
+    render: Callable
+    filters: Dict = field(default_factory=dict)
+    latest: bool = False
+
+
+def _bar_chart(df: pd.DataFrame, style: Dict, title: str, xaxis_title: str = '', colors: Optional[List] = None):
+    import plotly.graph_objects as go
+
+    if colors is None:
+        colors = [
+            style['significant_color'] if p < 0.05 else style['insignificant_color']
+            for p in df['p_value']
+        ]
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=df['label'], y=df['coefficient'],
+        error_y=dict(type='data', array=df['std_error'] * 1.96),
+        marker_color=colors
+    ))
+    fig.add_hline(y=0, line_dash="dash", line_color="black")
+    fig.update_layout(
+        title=title, xaxis_title=xaxis_title, yaxis_title='Treatment Effect (%)',
+        height=style['height'], template=style['template']
+    )
+    return fig
+
+
+def _time_windows(df: pd.DataFrame, style: Dict):
+    return _bar_chart(df, style, 'Treatment Effects: Different Windows', 'Lockup Day')
+
+
+def _company_size(df: pd.DataFrame, style: Dict):
+    return _bar_chart(df, style, 'Treatment Effects: Large vs Small IPOs')
+
+
+def _placebo_tests(df: pd.DataFrame, style: Dict):
+    colors = [
+        style['highlight_color'] if 'Day 180' in str(label) else style['placebo_color']
+        for label in df['label']
+    ]
+    return _bar_chart(df, style, 'Placebo Tests: Real vs Fake Lockup Dates', 'Day', colors)
+
+
+def _placebo_multiple_dates(df: pd.DataFrame, style: Dict):
+    import plotly.graph_objects as go
+
+    df = df.sort_values('lockup_day')
+    colors = [
+        style['highlight_color'] if day == 180 else style['line_color']
+        for day in df['lockup_day']
+    ]
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=df['lockup_day'], y=df['coefficient'], mode='lines+markers',
+        line=dict(color=style['line_color'], width=2),
+        marker=dict(size=10, color=colors),
+        error_y=dict(type='data', array=df['std_error'] * 1.96)
+    ))
+    fig.add_hline(y=0, line_dash="dash", line_color="gray")
+    fig.update_layout(
+        title='Placebo Tests: Effect by Assumed Lockup Day',
+        xaxis_title='Assumed Lockup Day', yaxis_title='Treatment Effect (%)',
+        height=style['height'], template=style['template']
+    )
+    return fig
+
+
+def _goodman_bacon(df: pd.DataFrame, style: Dict):
+    import plotly.graph_objects as go
+
+    fig = go.Figure()
+    for comparison, subset in df.groupby('label', sort=False):
+        fig.add_trace(go.Scatter(
+            x=subset['coefficient'], y=subset['weight'], mode='markers', name=comparison,
+            marker=dict(size=10)
+        ))
+    fig.update_layout(
+        title='Goodman-Bacon Decomposition: Weight vs ATT',
+        xaxis_title='ATT Estimate (%)', yaxis_title='Weight in TWFE',
+        height=style['height'], template=style['template']
+    )
+    return fig
+
+
+def _event_study_with_ci(df: pd.DataFrame, style: Dict):
+    import plotly.graph_objects as go
+
+    df = df.sort_values('event_time')
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=df['event_time'], y=df['coefficient'], mode='lines+markers', name='Point Estimate',
+        line=dict(color=style['line_color'], width=2), marker=dict(size=5)
+    ))
+    fig.add_trace(go.Scatter(
+        x=df['event_time'], y=df['ci_upper'], mode='lines', line=dict(width=0), showlegend=False
+    ))
+    fig.add_trace(go.Scatter(
+        x=df['event_time'], y=df['ci_lower'], mode='lines', fill='tonexty',
+        line=dict(width=0), name='95% CI', fillcolor=style['ci_fill']
+    ))
+    fig.add_hline(y=0, line_dash="dash", line_color="gray")
+    fig.add_vline(x=0, line_dash="solid", line_color=style['highlight_color'], annotation_text="Lockup Expires")
+    fig.update_layout(
+        title='Event Study: Dynamic Treatment Effects',
+        xaxis_title='Days Relative to Lockup Expiration', yaxis_title='Abnormal Return (%)',
+        height=style['height'], template=style['template']
+    )
+    return fig
+
+
+FIGURES = {
+    'time_windows': FigureSpec(
+        '03_treatment_effects_time_windows.png', _time_windows, {'kind': 'did', 'category': 'windows'}
+    ),
+    'company_size': FigureSpec(
+        '04_treatment_effects_company_size.png', _company_size, {'kind': 'did', 'category': 'size'}
+    ),
+    'placebo_tests': FigureSpec(
+        '05_placebo_tests.png', _placebo_tests, {'kind': 'did', 'category': 'placebos'}
+    ),
+    'goodman_bacon': FigureSpec(
+        '06_goodman_bacon_decomposition.png', _goodman_bacon, {'kind': 'bacon'}, latest=True
+    ),
+    'event_study_with_ci': FigureSpec(
+        '07_event_study_with_ci.png', _event_study_with_ci, {'kind': 'event_study'}, latest=True
+    ),
+    'placebo_multiple_dates': FigureSpec(
+        '08_placebo_multiple_dates.png', _placebo_multiple_dates, {'kind': 'did', 'category': 'placebo_dates'}
+    ),
+}
+
+
+def _input_rows(registry: ResultsRegistry, spec: FigureSpec) -> pd.DataFrame:
+    """Registry rows for a figure, latest run per label so re-runs replace old bars.
+
+    Bars only come from the data behind the most recent matching run - a
+    chart never mixes estimates from different versions of the panel.
+    """
+    df = registry.query(latest=spec.latest, **spec.filters)
+    if not spec.latest and len(df) > 0:
+        fingerprint = df['data_fingerprint'].iloc[-1]
+        same_data = df['data_fingerprint'].isna() if pd.isna(fingerprint) else df['data_fingerprint'] == fingerprint
+        df = df[same_data].drop_duplicates(subset=['label', 'lockup_day'], keep='last')
+    return df.reset_index(drop=True)
+
+
+def _input_hash(name: str, df: pd.DataFrame, style: Dict) -> str:
+    """Hash of what a figure depends on - result values and style, not run ids/timestamps."""
+    cols = ['label', 'category', 'event_time', 'lockup_day'] + RESULT_COLUMNS
+    payload = {
+        'figure': name,
+        'rows': df[cols].astype(object).where(df[cols].notna(), None).values.tolist(),
+        'style': style,
+    }
+    return hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _render_one(name: str, rows: List[Dict], style: Dict, path: str) -> str:
+    """Worker: draw and save one figure (runs in a separate process)."""
+    spec = FIGURES[name]
+    fig = spec.render(pd.DataFrame(rows), style)
+    fig.write_image(path, scale=style['scale'])
+    return path
+
+
+def render_figures(
+    registry: ResultsRegistry,
+    output_dir: str = "../outputs/figures",
+    names: Optional[List[str]] = None,
+    style: Optional[Dict] = None,
+    max_workers: Optional[int] = None,
+    force: bool = False
+) -> Dict[str, str]:
+    """Render registry-backed figures; returns {name: status}.
+
+    Status is 'rendered', 'unchanged' (inputs and style same as last time),
+    'no data', or 'failed: <error>'.
+    """
+    style = {**DEFAULT_STYLE, **(style or {})}
+    names = list(FIGURES) if names is None else names
+    unknown = [n for n in names if n not in FIGURES]
+    if unknown:
+        raise ValueError(f"Unknown figures {unknown} - available: {list(FIGURES)}")
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    cache_path = output_dir / CACHE_FILE
+    cache = json.loads(cache_path.read_text()) if cache_path.exists() else {}
+
+    status = {}
+    jobs = {}
+    for name in names:
+        df = _input_rows(registry, FIGURES[name])
+        if len(df) == 0:
+            status[name] = 'no data'
+            continue
+        digest = _input_hash(name, df, style)
+        path = output_dir / FIGURES[name].filename
+        if not force and cache.get(name) == digest and path.exists():
+            status[name] = 'unchanged'
+            continue
+        jobs[name] = (df.to_dict('records'), str(path), digest)
+
+    if jobs:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = {
+                name: pool.submit(_render_one, name, rows, style, path)
+                for name, (rows, path, _) in jobs.items()
+            }
+            for name, future in futures.items():
+                try:
+                    future.result()
+                except Exception as e:
+                    status[name] = f'failed: {e}'
+                    cache.pop(name, None)
+                    continue
+                status[name] = 'rendered'
+                cache[name] = jobs[name][2]
+
+        cache_path.write_text(json.dumps(cache, indent=2, sort_keys=True))
+
+    return status
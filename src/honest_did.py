@@ -0,0 +1,252 @@
+"""
+Honest DiD sensitivity analysis (Rambachan & Roth 2023) for event studies.
+
+test_parallel_trends only asks whether pre-period returns have a slope.
+This asks how much the post-lockup estimate could move if parallel trends
+failed by up to M:
+
+- 'smoothness' (Delta^SD): the trend's second difference is at most M per
+  day, so M=0 allows a linear continuation of the pre-trend.
+- 'relative_magnitudes' (Delta^RM): post-lockup day-to-day violations are
+  at most M times the largest pre-lockup one.
+
+Bounds come from linear programs over (beta, delta). Sampling uncertainty
+enters through a simultaneous (sup-t) confidence box for all event-study
+coefficients built from their full covariance; projecting that box through
+the LP gives a valid (if somewhat conservative) robust confidence set. All
+LPs share one constraint matrix and only the right-hand side moves with M,
+so each bound is convex piecewise-linear in M: it is traced from a handful
+of solves (value + dual slope, see _lp_value_path) instead of one per grid
+point.
+"""
+import pandas as pd
+import numpy as np
+from typing import Dict, Optional, Tuple, Union
+
+RESTRICTIONS = ('smoothness', 'relative_magnitudes')
+
+
+def _event_study_arrays(event_study: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int]:
+    """(periods, beta, cov, position of the reference period) from EventStudyEstimator output."""
+    if 'cov' not in event_study.attrs:
+        raise ValueError("Event study has no covariance in attrs['cov'] - re-run EventStudyEstimator.estimate")
+    period_col = 'event_time' if 'event_time' in event_study.columns else 'bin_start'
+    periods = np.asarray(event_study.attrs['cov']['periods'])
+    cov = np.asarray(event_study.attrs['cov']['matrix'], dtype=float)
+    if len(periods) == 0:
+        raise ValueError("No estimated event-study coefficients")
+
+    table = event_study.set_index(period_col)
+    beta = table.loc[periods, 'coefficient'].to_numpy(dtype=float)
+    reference = [t for t in table.index[~table['absorbed'].astype(bool)] if t not in set(periods)]
+    if len(reference) != 1:
+        raise ValueError(f"Expected one reference (omitted) period, found {reference}")
+    reference = reference[0]
+
+    order = np.argsort(periods)
+    periods, beta, cov = periods[order], beta[order], cov[np.ix_(order, order)]
+    if period_col == 'event_time':
+        full = np.sort(np.r_[periods, reference])
+        if (np.diff(full) != 1).any():
+            raise ValueError("Event times have gaps (absorbed days inside the window) - shrink the window")
+
+    ref_pos = int(np.searchsorted(periods, reference))
+    if ref_pos == 0 or ref_pos == len(periods):
+        raise ValueError("Need pre- and post-period coefficients on both sides of the reference period")
+    return periods, beta, cov, ref_pos
+
+
+def _target_weights(periods: np.ndarray, ref_pos: int, target: Union[str, Dict]) -> np.ndarray:
+    post = periods[ref_pos:]
+    if isinstance(target, dict):
+        unknown = set(target) - set(post.tolist())
+        if unknown:
+            raise ValueError(f"Target weights on non-post periods {sorted(unknown)}")
+        return np.array([target.get(t, 0.0) for t in post], dtype=float)
+    if target == 'first':
+        return np.eye(len(post))[0]
+    if target == 'average':
+        return np.full(len(post), 1.0 / len(post))
+    raise ValueError(f"target must be 'first', 'average' or {{period: weight}}, got '{target}'")
+
+
+def sup_t_critical_value(cov: np.ndarray, alpha: float = 0.05, n_sim: int = 20_000, seed: int = 0) -> float:
+    """1-alpha quantile of max_j |Z_j| / sd_j for Z ~ N(0, cov) (simultaneous band)."""
+    sd = np.sqrt(np.diag(cov))
+    corr = cov / np.outer(sd, sd)
+    vals, vecs = np.linalg.eigh(corr)
+    root = vecs * np.sqrt(np.maximum(vals, 0.0))
+    draws = np.random.default_rng(seed).standard_normal((n_sim, len(sd))) @ root.T
+    return float(np.quantile(np.abs(draws).max(axis=1), 1 - alpha))
+
+
+def _lp_value_path(
+    c: np.ndarray,
+    A_ub: np.ndarray,
+    rhs_unit: np.ndarray,
+    bounds: list,
+    m_grid: np.ndarray,
+    max_solves: Optional[int] = None
+) -> np.ndarray:
+    """min c'v s.t. A_ub v <= M * rhs_unit (plus bounds) for every M in m_grid.
+
+    rhs_unit >= 0, so the feasible set grows with M and the optimal value
+    is convex and piecewise-linear in M. Each solve gives the value and a
+    slope (duals @ rhs_unit), i.e. a supporting line. Where the tangents at
+    the two ends of an interval meet, one more solve either lands on them
+    (the value is linear on both halves) or splits the interval. That takes
+    about two solves per linear piece; the value at each grid point is the
+    max of the tangents. NaN where the LP is infeasible.
+    """
+    from scipy.optimize import linprog
+
+    values = np.full(len(m_grid), np.nan)
+    if len(m_grid) == 0:
+        return values
+    if max_solves is None:
+        max_solves = len(m_grid)
+
+    # Smallest feasible M: min t s.t. A_ub v - t * rhs_unit <= 0
+    m_min = linprog(
+        np.r_[np.zeros(len(c)), 1.0], A_ub=np.column_stack([A_ub, -rhs_unit]), b_ub=np.zeros(len(A_ub)),
+        bounds=list(bounds) + [(m_grid.min(), None)], method='highs'
+    )
+    if m_min.status != 0:
+        return values
+    feasible = m_grid >= m_min.x[-1] - 1e-9
+
+    def _direct():
+        for i in np.flatnonzero(feasible):
+            res = linprog(c, A_ub=A_ub, b_ub=m_grid[i] * rhs_unit, bounds=bounds, method='highs')
+            if res.status == 0:
+                values[i] = res.fun
+        return values
+
+    tangents = {}
+
+    def _tangent(m):
+        if m not in tangents:
+            res = linprog(c, A_ub=A_ub, b_ub=m * rhs_unit, bounds=bounds, method='highs')
+            tangents[m] = (res.fun, res.ineqlin.marginals @ rhs_unit) if res.status == 0 else None
+        return tangents[m]
+
+    grid = np.unique(m_grid[feasible])
+    if len(grid) == 0:
+        return values
+    stack = [(grid[0], grid[-1])]
+    while stack:
+        if len(tangents) > max_solves:
+            return _direct()
+        a, b = stack.pop()
+        fa, fb = _tangent(a), _tangent(b)
+        if fa is None or fb is None:
+            # Solver trouble right at the feasibility edge
+            return _direct()
+        (va, sa), (vb, sb) = fa, fb
+        if b - a <= 1e-12 or sb - sa <= 1e-12 * max(1.0, abs(sa), abs(sb)):
+            continue
+        # Tangents meet at m_star; the function can only lie above them
+        m_star = (vb - va + sa * a - sb * b) / (sa - sb)
+        if not a < m_star < b:
+            continue
+        tangent_value = va + sa * (m_star - a)
+        mid = _tangent(m_star)
+        if mid is None:
+            return _direct()
+        if mid[0] - tangent_value > 1e-9 * max(1.0, abs(tangent_value)):
+            stack += [(a, m_star), (m_star, b)]
+
+    points = np.array(list(tangents))
+    value_at, slope = np.array([tangents[m] for m in points]).T
+    lines = value_at[None, :] + slope[None, :] * (m_grid[feasible, None] - points[None, :])
+    values[feasible] = lines.max(axis=1)
+    return values
+
+
+def honest_did(
+    event_study: pd.DataFrame,
+    m_grid: Optional[np.ndarray] = None,
+    restriction: str = 'smoothness',
+    target: Union[str, Dict] = 'first',
+    alpha: float = 0.05,
+    n_sim: int = 20_000,
+    seed: int = 0
+) -> pd.DataFrame:
+    """Robust confidence sets for a post-lockup effect over a grid of M.
+
+    event_study is the output of EventStudyEstimator.estimate (daily or
+    binned). target picks the effect: 'first' post period, 'average' over
+    post periods, or {event_time: weight}. Returns one row per M with the
+    robust CI (ci_lower/ci_upper) and the identified set at the point
+    estimates (id_lower/id_upper); NaN where the pre-period coefficients
+    are incompatible with that M. attrs: 'breakdown_M' (smallest M whose CI
+    covers zero), 'original_ci', 'critical_value'.
+    """
+    if restriction not in RESTRICTIONS:
+        raise ValueError(f"restriction must be one of {RESTRICTIONS}, got '{restriction}'")
+
+    periods, beta, cov, ref_pos = _event_study_arrays(event_study)
+    n_est, n_post = len(beta), len(beta) - ref_pos
+    weights = _target_weights(periods, ref_pos, target)
+    sd = np.sqrt(np.diag(cov))
+
+    if m_grid is None:
+        m_grid = np.linspace(0, 2, 101) if restriction == 'relative_magnitudes' else np.linspace(0, sd.max(), 101)
+    m_grid = np.asarray(m_grid, dtype=float)
+
+    # Variables v = [beta (n_est), delta_post (n_post)]; delta_pre = beta_pre and
+    # delta at the reference period is 0. Full delta path = S @ v.
+    n_full = n_est + 1
+    S = np.zeros((n_full, n_est + n_post))
+    S[np.arange(ref_pos), np.arange(ref_pos)] = 1.0
+    S[ref_pos + 1 + np.arange(n_post), n_est + np.arange(n_post)] = 1.0
+    # theta = l'(beta_post - delta_post)
+    c = np.r_[np.zeros(ref_pos), weights, -weights]
+
+    crit = sup_t_critical_value(cov, alpha, n_sim, seed)
+    box = np.column_stack([beta - crit * sd, beta + crit * sd])
+
+    if restriction == 'smoothness':
+        diff = np.diff(np.eye(n_full), n=2, axis=0) @ S
+        A_ub = np.vstack([diff, -diff])
+    else:
+        first_diff = np.diff(np.eye(n_full), axis=0) @ S
+        post_diff = first_diff[ref_pos:]
+        A_ub = np.vstack([post_diff, -post_diff])
+
+    def _rhs_unit(lo_hi):
+        # Constraint right-hand side at M=1 (it scales linearly with M)
+        if restriction == 'smoothness':
+            return np.ones(len(A_ub))
+        # Largest pre-period |first difference| the (box or point) beta allows;
+        # bigger only loosens the post-period constraint, so the LP takes the max
+        pre = np.r_[lo_hi[:ref_pos], [[0.0, 0.0]]]
+        biggest = np.maximum(pre[1:, 1] - pre[:-1, 0], pre[:-1, 1] - pre[1:, 0]).max()
+        return np.full(len(A_ub), max(biggest, 0.0))
+
+    def _solve(lo_hi):
+        # NaN where infeasible - the pre-period coefficients already violate Delta(M)
+        bounds = [tuple(b) for b in lo_hi] + [(None, None)] * n_post
+        rhs_unit = _rhs_unit(lo_hi)
+        lower = _lp_value_path(c, A_ub, rhs_unit, bounds, m_grid)
+        upper = -_lp_value_path(-c, A_ub, rhs_unit, bounds, m_grid)
+        return lower, upper
+
+    ci_lower, ci_upper = _solve(box)
+    id_lower, id_upper = _solve(np.column_stack([beta, beta]))
+
+    out = pd.DataFrame({
+        'M': m_grid,
+        'ci_lower': ci_lower,
+        'ci_upper': ci_upper,
+        'id_lower': id_lower,
+        'id_upper': id_upper,
+    })
+    covers_zero = (out['ci_lower'] <= 0) & (out['ci_upper'] >= 0)
+    theta = weights @ beta[ref_pos:]
+    theta_se = np.sqrt(weights @ cov[ref_pos:, ref_pos:] @ weights)
+    out.attrs['breakdown_M'] = float(out.loc[covers_zero, 'M'].min()) if covers_zero.any() else np.nan
+    out.attrs['original_ci'] = (theta - 1.96 * theta_se, theta + 1.96 * theta_se)
+    out.attrs['critical_value'] = crit
+    out.attrs['restriction'] = restriction
+    return out
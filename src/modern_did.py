@@ -1,9 +1,10 @@
 """
 Modern DiD estimators (Callaway-Sant'Anna, Goodman-Bacon).
 
-NOTE: Implemented C-S for learning modern methods, but it's not fully
-applicable to IPO setting (universal treatment - all IPOs get lockups).
-Used Goodman-Bacon decomposition in main analysis. Keeping C-S for reference.
+NOTE: Implemented C-S for learning modern methods. The never-treated version
+doesn't apply to IPOs (universal treatment - all IPOs get lockups), but the
+not-yet-treated version does (until the last cohort gets treated) and is
+what we use as the robustness check next to Goodman-Bacon.
 """
 import pandas as pd
 import numpy as np
@@ -24,10 +25,8 @@ class CallawayResults:
 class CallawayEstimator:
     """Callaway-Sant'Anna (2021) DiD estimator.
 
-    Not fully applicable to IPO lockups (universal treatment) but useful
-    for robustness check. See Callaway & Sant'Anna (2021) JoE.
-
-    TODO: Could adapt for staggered timing instead of universal treatment
+    Use comparison_group='not_yet' for IPO lockups - every unit is treated
+    eventually so there's no never-treated group. See Callaway & Sant'Anna (2021) JoE.
     """
 
     def __init__(
@@ -36,11 +35,17 @@ class CallawayEstimator:
         outcome: str,
         group_var: str,
         time_var: str,
-        treatment_var: str
+        treatment_var: str,
+        covariates: Optional[List[str]] = None
     ):
-        """Init estimator."""
+        """Init estimator.
+
+        covariates are unit-level (e.g. Market_Cap_Proxy, Early_Volatility from
+        get_company_characteristics merged onto the panel) and are only used by
+        estimation='dr'. First value per unit is used.
+        """
         # Check required columns exist
-        required_cols = [outcome, group_var, time_var, treatment_var]
+        required_cols = [outcome, group_var, time_var, treatment_var] + list(covariates or [])
         missing = [c for c in required_cols if c not in data.columns]
         if missing:
             raise ValueError(f"Missing required columns: {missing}")
@@ -50,6 +55,11 @@ class CallawayEstimator:
         self.group_var = group_var
         self.time_var = time_var
         self.treatment_var = treatment_var
+        self.covariates = list(covariates or [])
+
+        # DR nuisance fits, keyed by comparison set - shared across comparison_group choices
+        self._pscore_cache: Dict = {}
+        self._outcome_cache: Dict = {}
 
     def _identify_cohorts(self) -> pd.DataFrame:
         """Identify treatment cohorts (first treatment time per entity)."""
@@ -71,8 +81,7 @@ class CallawayEstimator:
         comparison_group: str = 'never_treated'
     ) -> Dict:
         """Compute group-time ATT."""
-        # TODO: Should probably use propensity scores here for more robust comparison
-        # TODO: Add doubly-robust estimation (propensity scores + outcome regression)
+        # Propensity scores + outcome regression: see estimation='dr'
         # TODO: Bootstrap SEs instead of analytical (more robust to misspecification)
         # Current approach is simplified DiD
         # Get treated units in this cohort
@@ -146,11 +155,281 @@ class CallawayEstimator:
             'n_control': len(control_merged)
         }
 
-    def estimate(self, comparison_group: str = 'never_treated') -> CallawayResults:
+    def _unit_design(self, units: pd.Index) -> np.ndarray:
+        """Intercept + standardized unit covariates (rows follow units)."""
+        cov = self.data.groupby(self.group_var)[self.covariates].first().reindex(units)
+        if cov.isna().any().any():
+            missing = cov.index[cov.isna().any(axis=1)].tolist()
+            raise ValueError(f"Missing covariates for units: {missing[:5]}")
+        z = cov.to_numpy(dtype=float)
+        sd = z.std(axis=0)
+        z = (z - z.mean(axis=0)) / np.where(sd > 0, sd, 1.0)
+        return np.column_stack([np.ones(len(units)), z])
+
+    def _fit_pscores(
+        self,
+        x: np.ndarray,
+        treated: np.ndarray,
+        sample: np.ndarray,
+        init: np.ndarray,
+        max_iter: int = 50,
+        tol: float = 1e-8
+    ) -> np.ndarray:
+        """Batched logit (Newton) - one problem per row of treated/sample.
+
+        x is shared across problems (units x k); treated/sample are P x units
+        masks. All P problems take a Newton step together.
+        """
+        # Tiny ridge keeps single-IPO cohorts from blowing up (separation)
+        ridge = 1e-4 * np.eye(x.shape[1])
+        beta = init.copy()
+        for _ in range(max_iter):
+            p = 1.0 / (1.0 + np.exp(-np.clip(beta @ x.T, -30, 30)))
+            grad = ((treated - p) * sample) @ x - beta @ ridge
+            hess = np.einsum('pn,nk,nl->pkl', sample * p * (1 - p), x, x) + ridge
+            step = np.linalg.solve(hess, grad[:, :, None])[:, :, 0]
+            beta += step
+            if np.abs(step).max() < tol:
+                break
+        return beta
+
+    def _compute_group_time_att_dr(self, cells: List, comparison_group: str) -> List[Dict]:
+        """Doubly-robust ATT(g,t) (Sant'Anna & Zhao 2020) for all cells at once.
+
+        Propensity models depend only on (cohort, comparison set) and outcome
+        regressions only on the comparison set, so cells are grouped by those
+        keys and solved in batches instead of one fit per (g,t). SEs come
+        from the closed-form influence function (see _dr_influence).
+        """
+        if not self.covariates:
+            raise ValueError("estimation='dr' needs covariates")
+
+        cohorts = self._identify_cohorts()
+        wide = self.data.pivot_table(index=self.group_var, columns=self.time_var, values=self.outcome)
+        units = wide.index
+        x = self._unit_design(units)
+        unit_cohort = cohorts.set_index(self.group_var)['cohort'].reindex(units).to_numpy(dtype=float)
+        unit_cohort = np.where(np.isnan(unit_cohort), np.inf, unit_cohort)
+        time_pos = {t: i for i, t in enumerate(wide.columns)}
+        y = wide.to_numpy(dtype=float)
+
+        # Group cells by comparison set
+        by_set: Dict = {}
+        for cohort, t in cells:
+            if comparison_group == 'never_treated':
+                control = np.isinf(unit_cohort)
+            else:
+                # Treated later - never-treated units aren't "not yet treated"
+                control = (unit_cohort > t) & np.isfinite(unit_cohort)
+            key = control.tobytes()
+            by_set.setdefault(key, (control, []))[1].append((cohort, t))
+
+        # Propensity scores: one logit per (cohort, comparison set) not cached yet
+        todo = []
+        for key, (control, set_cells) in by_set.items():
+            for cohort in {c for c, _ in set_cells}:
+                if (cohort, key) not in self._pscore_cache and control.any():
+                    todo.append((cohort, key, control))
+        if todo:
+            treated = np.array([unit_cohort == c for c, _, _ in todo], dtype=float)
+            sample = np.array([(unit_cohort == c) | ctrl for c, _, ctrl in todo], dtype=float)
+            # Warm start from any cached fit for the same cohort, else the pooled share
+            init = np.zeros((len(todo), x.shape[1]))
+            for i, (c, _, _) in enumerate(todo):
+                prev = [b for (cc, _), b in self._pscore_cache.items() if cc == c]
+                if prev:
+                    init[i] = prev[-1]
+                else:
+                    share = treated[i].sum() / sample[i].sum()
+                    init[i, 0] = np.log(share / (1 - share)) if 0 < share < 1 else 0.0
+            betas = self._fit_pscores(x, treated, sample, init)
+            for (c, key, _), b in zip(todo, betas):
+                self._pscore_cache[(c, key)] = b
+
+        out = {}
+        for key, (control, set_cells) in by_set.items():
+            if not control.any():
+                for cohort, t in set_cells:
+                    n_treated = int((unit_cohort == cohort).sum())
+                    out[(cohort, t)] = {'att': np.nan, 'se': np.nan, 'n_treated': n_treated, 'n_control': 0}
+                continue
+
+            # Outcome changes for every cell in this set: units x cells
+            base = np.array([time_pos.get(c - 1, -1) for c, _ in set_cells])
+            post = np.array([time_pos.get(t, -1) for _, t in set_cells])
+            dy = np.full((len(units), len(set_cells)), np.nan)
+            ok = (base >= 0) & (post >= 0)
+            dy[:, ok] = y[:, post[ok]] - y[:, base[ok]]
+            avail = ~np.isnan(dy)
+
+            # Outcome regression on controls, all uncached cells in one batched solve
+            todo = [j for j, cell in enumerate(set_cells) if (key,) + cell not in self._outcome_cache]
+            if todo:
+                ctrl_avail = (avail[:, todo] & control[:, None]).T.astype(float)  # cells x units
+                xtx = np.einsum('cn,nk,nl->ckl', ctrl_avail, x, x)
+                xty = np.einsum('cn,nk->ck', ctrl_avail * np.nan_to_num(dy[:, todo]).T, x)
+                coefs = np.linalg.solve(xtx + 1e-10 * np.eye(x.shape[1]), xty[:, :, None])[:, :, 0]
+                for j, b in zip(todo, coefs):
+                    self._outcome_cache[(key,) + set_cells[j]] = b
+            outcome_coefs = np.array([self._outcome_cache[(key,) + cell] for cell in set_cells])
+            resid = dy - x @ outcome_coefs.T
+
+            for j, (cohort, t) in enumerate(set_cells):
+                is_treated = (unit_cohort == cohort) & avail[:, j]
+                is_control = control & avail[:, j]
+                n_t, n_c = int(is_treated.sum()), int(is_control.sum())
+                if n_t == 0 or n_c == 0:
+                    out[(cohort, t)] = {'att': np.nan, 'se': np.nan, 'n_treated': n_t, 'n_control': n_c}
+                    continue
+
+                cell = is_treated | is_control
+                att, influence = self._dr_influence(
+                    x[cell], is_treated[cell].astype(float), resid[cell, j], self._pscore_cache[(cohort, key)]
+                )
+                se = influence.std(ddof=1) / np.sqrt(len(influence))
+                out[(cohort, t)] = {'att': att, 'se': se, 'n_treated': n_t, 'n_control': n_c}
+
+        return [out[cell] for cell in cells]
+
+    @staticmethod
+    def _dr_influence(x: np.ndarray, d: np.ndarray, resid: np.ndarray, ps_coef: np.ndarray):
+        """DR ATT and its influence function (Sant'Anna & Zhao 2020, panel case).
+
+        x: design for treated + control units, d: treated indicator, resid:
+        outcome change minus the control-fitted outcome regression. The
+        influence function includes the estimation error of the propensity
+        score and the outcome regression, so SE = sd(influence) / sqrt(n).
+        """
+        n = len(d)
+        ps = 1.0 / (1.0 + np.exp(-np.clip(x @ ps_coef, -30, 30)))
+        w_t = d
+        w_c = ps * (1 - d) / (1 - ps)
+        eta_t = (w_t @ resid) / w_t.sum()
+        eta_c = (w_c @ resid) / w_c.sum()
+
+        # Asymptotic linear representations of the nuisance fits (n x k)
+        ols_lin = ((1 - d) * resid)[:, None] * x @ np.linalg.pinv(((1 - d)[:, None] * x).T @ x / n)
+        ps_lin = (d - ps)[:, None] * x @ np.linalg.pinv(((ps * (1 - ps))[:, None] * x).T @ x / n)
+
+        inf_t = (w_t * (resid - eta_t) - ols_lin @ (w_t @ x / n)) / w_t.mean()
+        inf_c = (
+            w_c * (resid - eta_c)
+            + ps_lin @ ((w_c * (resid - eta_c)) @ x / n)
+            - ols_lin @ (w_c @ x / n)
+        ) / w_c.mean()
+        return eta_t - eta_c, inf_t - inf_c
+
+    def _compute_not_yet_atts_sweep(self, cells: List) -> List[Dict]:
+        """ATT(g,t) vs not-yet-treated for all cells in one sweep over time.
+
+        Units are sorted by cohort once. Walking forward in calendar time, a
+        cohort leaves the not-yet-treated pool when it gets treated, so the
+        pool sums (per base period g-1 and calendar time) are kept as running
+        totals and downdated once per cohort as it drops out (one matmul
+        over its units) - no per-cell filtering. Same numbers as _compute_group_time_att on an integer time
+        grid; base period is the previous observed period (works with dates too).
+        """
+        cohorts = self._identify_cohorts()
+        wide = self.data.pivot_table(index=self.group_var, columns=self.time_var, values=self.outcome)
+        periods = list(wide.columns)
+        time_pos = {t: i for i, t in enumerate(periods)}
+        n_periods = len(periods)
+
+        y_obs = ~np.isnan(wide.to_numpy(dtype=float))
+        y = np.nan_to_num(wide.to_numpy(dtype=float))
+        obs = y_obs.astype(float)
+
+        # Cohort position per unit (never treated: n_periods)
+        unit_cohort = cohorts.set_index(self.group_var)['cohort'].reindex(wide.index)
+        unit_pos = np.array([time_pos.get(c, n_periods) for c in unit_cohort], dtype=np.int64)
+        order = np.argsort(unit_pos, kind='stable')
+        leave_at = np.searchsorted(unit_pos[order], np.arange(n_periods + 1), side='left')
+
+        cohort_pos = sorted({time_pos[c] for c, _ in cells})
+        base = np.array(cohort_pos) - 1
+        valid_base = base >= 0
+        b = np.where(valid_base, base, 0)
+        obs_b = obs[:, b] * valid_base
+        y_b = y[:, b] * valid_base
+
+        # Running pool totals, rows = cohort (its base period), cols = calendar time.
+        # Only pairs where both periods are observed count, like the merge does.
+        # The pool starts as every eventually-treated unit - never-treated units
+        # aren't "not yet treated", same as _compute_group_time_att
+        in_pool = unit_pos < n_periods
+        ob, yb, o, yy = obs_b[in_pool], y_b[in_pool], obs[in_pool], y[in_pool]
+        pool_n = ob.T @ o
+        pool_sum = ob.T @ yy - yb.T @ o
+        pool_sq = ob.T @ yy ** 2 - 2 * yb.T @ yy + (yb ** 2).T @ o
+
+        row_of = {p: i for i, p in enumerate(cohort_pos)}
+        wanted = {}
+        for cohort, t in cells:
+            wanted.setdefault(time_pos[t], []).append(cohort)
+
+        out = {}
+        for t in range(n_periods):
+            # The cohort treated at t leaves the pool - one downdate for all
+            # its units, and only columns >= t since earlier ones aren't read again
+            leaving = order[leave_at[t]:leave_at[t + 1]]
+            if len(leaving):
+                ob, yb = obs_b[leaving], y_b[leaving]
+                o, yy = obs[leaving, t:], y[leaving, t:]
+                pool_n[:, t:] -= ob.T @ o
+                pool_sum[:, t:] -= ob.T @ yy - yb.T @ o
+                pool_sq[:, t:] -= ob.T @ yy ** 2 - 2 * yb.T @ yy + (yb ** 2).T @ o
+
+            for cohort in wanted.get(t, []):
+                g = row_of[time_pos[cohort]]
+                treated = unit_pos == time_pos[cohort]
+                n_control = int(round(pool_n[g, t]))
+                if not valid_base[g] or n_control == 0:
+                    out[(cohort, periods[t])] = {
+                        'att': np.nan, 'se': np.nan,
+                        'n_treated': int(treated.sum()), 'n_control': n_control
+                    }
+                    continue
+
+                both = treated & y_obs[:, t] & y_obs[:, base[g]]
+                change = y[both, t] - y[both, base[g]]
+                if len(change) == 0:
+                    out[(cohort, periods[t])] = {
+                        'att': np.nan, 'se': np.nan, 'n_treated': 0, 'n_control': n_control
+                    }
+                    continue
+
+                control_mean = pool_sum[g, t] / n_control
+                att = change.mean() - control_mean
+
+                # Same simplified SE as the per-cell version (NaN with a single unit)
+                var_treated = change.var(ddof=1) / len(change) if len(change) > 1 else np.nan
+                var_control = (
+                    (pool_sq[g, t] - n_control * control_mean ** 2) / (n_control - 1) / n_control
+                    if n_control > 1 else np.nan
+                )
+                out[(cohort, periods[t])] = {
+                    'att': att,
+                    'se': np.sqrt(np.maximum(var_treated + var_control, 0.0)),
+                    'n_treated': len(change),
+                    'n_control': n_control
+                }
+
+        return [out[cell] for cell in cells]
+
+    def estimate(self, comparison_group: str = 'never_treated', estimation: str = 'simple') -> CallawayResults:
         """Estimate C-S ATT.
 
-        NOTE: Will fail if no never-treated units (which is the case for IPO lockups)
+        estimation='simple' is the plain 2x2 DiD per cell, 'dr' is the
+        doubly-robust version using self.covariates.
+
+        comparison_group='never_treated' needs never-treated units (IPO
+        lockups have none - every cell comes back NaN and this raises);
+        'not_yet' compares each cohort with units treated later, and never
+        uses never-treated units.
         """
+        if estimation not in ('simple', 'dr'):
+            raise ValueError(f"Unknown estimation '{estimation}' - use 'simple' or 'dr'")
+
         try:
             cohorts = self._identify_cohorts()
         except ValueError as e:
@@ -159,21 +438,31 @@ class CallawayEstimator:
         time_periods = sorted(self.data[self.time_var].unique())
         # print(f"DEBUG: Found {len(cohorts)} cohorts, {len(time_periods)} time periods")
 
+        cells = [
+            (cohort, t)
+            for cohort in cohorts['cohort'].unique()
+            for t in time_periods
+            if t >= cohort  # Only post-treatment periods
+        ]
+        if estimation == 'dr':
+            cell_results = self._compute_group_time_att_dr(cells, comparison_group)
+        elif comparison_group == 'not_yet':
+            cell_results = self._compute_not_yet_atts_sweep(cells)
+        else:
+            cell_results = [self._compute_group_time_att(c, t, comparison_group) for c, t in cells]
+
         # Compute group-time ATTs
         results = []
-        for cohort in cohorts['cohort'].unique():
-            for t in time_periods:
-                if t >= cohort:  # Only post-treatment periods
-                    result = self._compute_group_time_att(cohort, t, comparison_group)
-                    results.append({
-                        'cohort': cohort,
-                        'time': t,
-                        'event_time': t - cohort,
-                        'att': result['att'],
-                        'se': result['se'],
-                        'n_treated': result['n_treated'],
-                        'n_control': result['n_control']
-                    })
+        for (cohort, t), result in zip(cells, cell_results):
+            results.append({
+                'cohort': cohort,
+                'time': t,
+                'event_time': t - cohort,
+                'att': result['att'],
+                'se': result['se'],
+                'n_treated': result['n_treated'],
+                'n_control': result['n_control']
+            })
 
         df_results = pd.DataFrame(results)
         df_results = df_results.dropna(subset=['att'])
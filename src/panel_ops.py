@@ -0,0 +1,157 @@
+"""
+Low-level panel helpers on integer-coded (entity, time) arrays.
+
+PanelOLS is fine for one-off fits but re-does the demeaning every call.
+These work straight on numpy arrays with np.bincount so the demeaned data
+(or cross-products of it) can be reused across many specs.
+"""
+import pandas as pd
+import numpy as np
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class PanelCodes:
+    """Integer codes for the entity and time dimensions of a panel."""
+    entity_codes: np.ndarray
+    time_codes: np.ndarray
+    entity_labels: pd.Index
+    time_labels: pd.Index
+
+    @property
+    def n_entities(self) -> int:
+        return len(self.entity_labels)
+
+    @property
+    def n_times(self) -> int:
+        return len(self.time_labels)
+
+
+def encode_panel(data: pd.DataFrame, entity_var: str = 'Ticker', time_var: str = 'Date') -> PanelCodes:
+    """Factorize entity/time columns into 0..n-1 codes (sorted labels)."""
+    entity_codes, entity_labels = pd.factorize(data[entity_var], sort=True)
+    time_codes, time_labels = pd.factorize(data[time_var], sort=True)
+    return PanelCodes(
+        entity_codes=entity_codes.astype(np.int64),
+        time_codes=time_codes.astype(np.int64),
+        entity_labels=pd.Index(entity_labels),
+        time_labels=pd.Index(time_labels)
+    )
+
+
+def entity_offsets(entity_codes: np.ndarray) -> np.ndarray:
+    """Start row of each entity's block in a panel sorted by entity (plus end)."""
+    if len(entity_codes) > 1 and (np.diff(entity_codes) < 0).any():
+        raise ValueError("Panel must be sorted by entity - run prepare_panel_data first")
+    return np.r_[0, np.cumsum(np.bincount(entity_codes))]
+
+
+def segment_sums(x: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """Sums of x over [offsets[i], offsets[i+1]) blocks (works on 1-D or 2-D x)."""
+    x = np.asarray(x, dtype=float)
+    starts = offsets[:-1]
+    if len(x) == 0:
+        return np.zeros((len(starts),) + x.shape[1:])
+    sums = np.add.reduceat(x, np.minimum(starts, len(x) - 1), axis=0)
+    # reduceat returns x[start] for empty blocks - zero them out
+    sums[starts == offsets[1:]] = 0.0
+    return sums
+
+
+def group_sums(x: np.ndarray, codes: np.ndarray, n_groups: int) -> np.ndarray:
+    """Column-wise sums of x within groups (n_groups x k)."""
+    x = np.asarray(x, dtype=float)
+    if x.ndim == 1:
+        return np.bincount(codes, weights=x, minlength=n_groups)
+    out = np.zeros((n_groups, x.shape[1]))
+    for j in range(x.shape[1]):
+        out[:, j] = np.bincount(codes, weights=x[:, j], minlength=n_groups)
+    return out
+
+
+def cluster_meat(scores: np.ndarray, codes: np.ndarray, n_groups: Optional[int] = None) -> np.ndarray:
+    """Sum over clusters of (summed score)(summed score)' - no cluster dummies needed."""
+    scores = np.asarray(scores, dtype=float)
+    if scores.ndim == 1:
+        scores = scores[:, None]
+    n_groups = int(codes.max()) + 1 if n_groups is None else n_groups
+    sums = group_sums(scores, codes, n_groups)
+    return sums.T @ sums
+
+
+def twoway_cluster_meat(scores: np.ndarray, entity_codes: np.ndarray, time_codes: np.ndarray) -> np.ndarray:
+    """Cameron-Gelbach-Miller two-way meat: entity + time - (entity, time) cell.
+
+    With one row per (entity, date) the cell term is just the
+    heteroskedasticity-robust one, but duplicates are handled too.
+    """
+    n_times = int(time_codes.max()) + 1
+    _, cell_codes = np.unique(entity_codes * n_times + time_codes, return_inverse=True)
+    return (
+        cluster_meat(scores, entity_codes)
+        + cluster_meat(scores, time_codes)
+        - cluster_meat(scores, cell_codes.ravel())
+    )
+
+
+def demean_twoway(
+    x: np.ndarray,
+    entity_codes: np.ndarray,
+    time_codes: np.ndarray,
+    mask: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """Sweep out entity and time effects exactly.
+
+    Entity means come out first; the date effects then solve the
+    (dates x dates) system of the entity-demeaned date dummies directly,
+    A = diag(n_t) - C' diag(1/n_g) C with C the entity x date counts. A is
+    singular (a constant per connected part of the panel), so one date per
+    part is pinned to zero, like the reference date of a dummy regression.
+    Unlike alternating projections this doesn't slow down on staggered,
+    weakly connected panels. With a boolean mask only those rows count -
+    masked-out rows come back as zeros - so a subsample is demeaned on the
+    full coded arrays without building a filtered copy.
+    """
+    from scipy.linalg import cho_factor, cho_solve
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+
+    resid = np.array(x, dtype=float)
+    one_d = resid.ndim == 1
+    if one_d:
+        resid = resid[:, None]
+    n_entities = int(entity_codes.max()) + 1
+    n_times = int(time_codes.max()) + 1
+    weights = np.ones(len(resid)) if mask is None else np.asarray(mask, dtype=float)
+    rows = weights > 0
+    entity, time = entity_codes[rows], time_codes[rows]
+    resid *= weights[:, None]
+
+    # Entity-demean
+    entity_counts = np.bincount(entity, minlength=n_entities).astype(float)
+    entity_counts[entity_counts == 0] = 1.0  # entities with no rows in the mask
+    resid[rows] -= (group_sums(resid[rows], entity, n_entities) / entity_counts[:, None])[entity]
+
+    # Date effects of the entity-demeaned data: A pi = T'resid
+    counts = np.bincount(entity * n_times + time, minlength=n_entities * n_times).reshape(n_entities, n_times)
+    a = np.diag(counts.sum(axis=0).astype(float)) - (counts / entity_counts[:, None]).T @ counts
+    n_parts, part = connected_components(
+        coo_matrix((np.ones(len(entity)), (entity, n_entities + time)),
+                   shape=(n_entities + n_times,) * 2),
+        directed=False
+    )
+    time_part = part[n_entities:]
+    # First date of each part is its reference (a date without rows is a part of its own)
+    pinned = np.unique(time_part, return_index=True)[1]
+    a[pinned, pinned] += 1.0
+    rhs = group_sums(resid[rows], time, n_times)
+    try:
+        pi = cho_solve(cho_factor(a), rhs)
+    except np.linalg.LinAlgError:
+        pi = np.linalg.lstsq(a, rhs, rcond=None)[0]
+
+    # Subtract the entity-demeaned fitted date effects
+    fitted = pi[time]
+    resid[rows] -= fitted - (group_sums(fitted, entity, n_entities) / entity_counts[:, None])[entity]
+    return resid[:, 0] if one_d else resid
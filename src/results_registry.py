@@ -0,0 +1,282 @@
+"""
+Results registry - every estimate goes into one local SQLite file.
+
+Notebooks used to overwrite the CSVs in outputs/results on every run, so
+there was no way to ask "all runs with lockup day 150 and clustered SEs"
+without loading everything. Spec parameters, a data fingerprint and the
+run time are indexed columns; the old CSV layouts can be exported from here.
+
+SQLite because it ships with Python (no extra dependency) and handles
+appends from several processes with WAL mode.
+"""
+import hashlib
+import json
+import sqlite3
+import uuid
+import pandas as pd
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .estimators import DiDResult
+
+
+# Spec keys that get their own (queryable) column - the rest goes into spec_json
+SPEC_COLUMNS = ['estimator', 'outcome', 'treatment', 'lockup_day', 'cov_type', 'pre_window', 'post_window']
+RESULT_COLUMNS = [
+    'coefficient', 'std_error', 't_stat', 'p_value', 'ci_lower', 'ci_upper',
+    'n_obs', 'n_entities', 'r_squared', 'weight'
+]
+QUERY_COLUMNS = ['run_id', 'kind', 'label', 'category', 'data_fingerprint', 'event_time'] + SPEC_COLUMNS
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL,
+    run_at TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    label TEXT,
+    category TEXT,
+    data_fingerprint TEXT,
+    event_time REAL,
+    estimator TEXT,
+    outcome TEXT,
+    treatment TEXT,
+    lockup_day INTEGER,
+    cov_type TEXT,
+    pre_window INTEGER,
+    post_window INTEGER,
+    spec_json TEXT,
+    {', '.join(f'{c} REAL' for c in RESULT_COLUMNS)}
+);
+CREATE INDEX IF NOT EXISTS idx_results_spec ON results (kind, lockup_day, cov_type, estimator);
+CREATE INDEX IF NOT EXISTS idx_results_fingerprint ON results (data_fingerprint);
+CREATE INDEX IF NOT EXISTS idx_results_run_at ON results (run_at);
+CREATE INDEX IF NOT EXISTS idx_results_run_id ON results (run_id);
+"""
+
+# Column mapping for the CSV files the notebooks used to write
+CSV_LAYOUTS = {
+    'did_main': {
+        'coefficient': 'Treatment_Effect', 'std_error': 'Std_Error', 't_stat': 'T_Stat',
+        'p_value': 'P_Value', 'ci_lower': 'CI_Lower', 'ci_upper': 'CI_Upper',
+        'n_obs': 'N_Obs', 'n_entities': 'N_Companies'
+    },
+    'event_study': {
+        'event_time': 'Week', 'coefficient': 'Coef', 'std_error': 'SE', 'p_value': 'PValue',
+        'ci_lower': 'CI_Lower', 'ci_upper': 'CI_Upper', 'significant': 'Significant'
+    },
+    'robustness': {
+        'label': 'label', 'coefficient': 'coef', 'std_error': 'se', 'p_value': 'pval',
+        'ci_lower': 'ci_lower', 'ci_upper': 'ci_upper', 'n_obs': 'n_obs',
+        'n_entities': 'n_companies', 'significant': 'significant', 'category': 'category'
+    }
+}
+
+
+def data_fingerprint(df: pd.DataFrame) -> str:
+    """Short content hash of a panel (row order matters, index doesn't)."""
+    row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return hashlib.sha1(row_hashes.tobytes()).hexdigest()[:16]
+
+
+class ResultsRegistry:
+    """Append-only store of estimation results (one row per coefficient)."""
+
+    def __init__(self, path: str = "../outputs/results/registry.sqlite"):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.executescript(_SCHEMA)
+            # Registries made before a result column existed get it added
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(results)")}
+            for col in RESULT_COLUMNS:
+                if col not in existing:
+                    conn.execute(f"ALTER TABLE results ADD COLUMN {col} REAL")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Parallel runs each open their own connection; WAL lets readers and
+        # one writer work at once and the timeout makes writers queue up
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    @staticmethod
+    def _row(
+        result: Dict,
+        kind: str,
+        spec: Dict,
+        run_id: str,
+        run_at: str,
+        fingerprint: Optional[str],
+        label: Optional[str],
+        category: Optional[str]
+    ) -> Dict:
+        unknown = {k: v for k, v in spec.items() if k not in SPEC_COLUMNS}
+        row = {
+            'run_id': run_id, 'run_at': run_at, 'kind': kind,
+            'label': label, 'category': category, 'data_fingerprint': fingerprint,
+            'event_time': _plain(result.get('event_time')),
+            'spec_json': json.dumps(unknown, sort_keys=True, default=str)
+        }
+        row.update({c: _plain(spec.get(c)) for c in SPEC_COLUMNS})
+        for c in RESULT_COLUMNS:
+            value = result.get(c)
+            row[c] = None if value is None or pd.isna(value) else float(value)
+        return row
+
+    def record(
+        self,
+        result: DiDResult,
+        spec: Optional[Dict] = None,
+        fingerprint: Optional[str] = None,
+        kind: str = 'did',
+        label: Optional[str] = None,
+        category: Optional[str] = None
+    ) -> str:
+        """Store a single DiDResult. Returns the run id."""
+        spec = dict(spec or {})
+        spec.setdefault('estimator', result.estimator)
+        return self.record_many([{
+            'result': result.to_dict(), 'spec': spec, 'fingerprint': fingerprint,
+            'kind': kind, 'label': label, 'category': category
+        }])
+
+    def record_event_study(
+        self,
+        coeffs: pd.DataFrame,
+        spec: Optional[Dict] = None,
+        fingerprint: Optional[str] = None
+    ) -> str:
+        """Store EventStudyEstimator output (one row per event time, same run id)."""
+        spec = dict(spec or {})
+        spec.setdefault('estimator', 'EventStudy')
+        if 'event_time' not in coeffs.columns and 'bin_start' in coeffs.columns:
+            coeffs = coeffs.rename(columns={'bin_start': 'event_time'})
+        run_id, run_at = uuid.uuid4().hex, _now()
+        self._insert([
+            self._row(r, 'event_study', spec, run_id, run_at, fingerprint, None, None)
+            for r in coeffs.to_dict('records')
+        ])
+        return run_id
+
+    def record_many(self, entries: List[Dict], run_id: Optional[str] = None) -> str:
+        """Batched append - one transaction and one run id for the whole list.
+
+        Each entry is a dict with 'result' (DiDResult or dict) and optional
+        'spec', 'fingerprint', 'kind', 'label', 'category'. Pass run_id to
+        add to an existing run. Returns the run id.
+        """
+        run_id = run_id or uuid.uuid4().hex
+        run_at = _now()
+        rows = []
+        for entry in entries:
+            result = entry['result']
+            if isinstance(result, DiDResult):
+                result = result.to_dict()
+            rows.append(self._row(
+                result, entry.get('kind', 'did'), entry.get('spec') or {}, run_id, run_at,
+                entry.get('fingerprint'), entry.get('label'), entry.get('category')
+            ))
+        self._insert(rows)
+        return run_id
+
+    def _insert(self, rows: List[Dict]) -> None:
+        if not rows:
+            return
+        cols = list(rows[0].keys())
+        sql = f"INSERT INTO results ({', '.join(cols)}) VALUES ({', '.join('?' for _ in cols)})"
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(sql, [tuple(r[c] for c in cols) for r in rows])
+        finally:
+            conn.close()
+
+    def query(
+        self,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        latest: bool = False,
+        **filters
+    ) -> pd.DataFrame:
+        """Filter on indexed columns, e.g. query(lockup_day=150, cov_type='clustered').
+
+        A list value means IN (...). since/until compare against run_at (ISO
+        strings). latest=True keeps only the most recent run among the matches.
+        """
+        unknown = [k for k in filters if k not in QUERY_COLUMNS]
+        if unknown:
+            raise ValueError(f"Can't filter on {unknown} - use one of {QUERY_COLUMNS}")
+
+        clauses, params = [], []
+        for col, value in filters.items():
+            if isinstance(value, (list, tuple, set)):
+                clauses.append(f"{col} IN ({', '.join('?' for _ in value)})")
+                params.extend(value)
+            elif value is None:
+                clauses.append(f"{col} IS NULL")
+            else:
+                clauses.append(f"{col} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("run_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("run_at <= ?")
+            params.append(until)
+
+        sql = "SELECT * FROM results"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY id"
+
+        conn = self._connect()
+        try:
+            df = pd.read_sql_query(sql, conn, params=params)
+        finally:
+            conn.close()
+
+        if latest and len(df) > 0:
+            df = df[df['run_id'] == df['run_id'].iloc[-1]]
+        return df.reset_index(drop=True)
+
+    def export_csv(self, layout: str, path: str, **filters) -> pd.DataFrame:
+        """Write matching rows in one of the old CSV layouts (see CSV_LAYOUTS).
+
+        did_main and event_study export the latest matching run only;
+        robustness exports every matching row.
+        """
+        if layout not in CSV_LAYOUTS:
+            raise ValueError(f"Unknown layout '{layout}' - use one of {list(CSV_LAYOUTS)}")
+
+        kind = {'did_main': 'did', 'event_study': 'event_study', 'robustness': 'did'}[layout]
+        filters.setdefault('kind', kind)
+        df = self.query(latest=layout != 'robustness', **filters)
+        if len(df) == 0:
+            raise ValueError(f"No results match {filters}")
+
+        df['significant'] = df['p_value'] < 0.05
+        if layout == 'event_study':
+            df = df.sort_values('event_time')
+            df['event_time'] = df['event_time'].astype(int)
+        for col in ('n_obs', 'n_entities'):
+            df[col] = df[col].astype('Int64')
+
+        mapping = CSV_LAYOUTS[layout]
+        out = df[list(mapping)].rename(columns=mapping)
+        out.to_csv(path, index=False)
+        return out
+
+
+def _plain(value):
+    """numpy scalars -> Python scalars (sqlite3 can't bind np.int64)."""
+    return value.item() if hasattr(value, 'item') else value
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec='microseconds')
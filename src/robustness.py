@@ -0,0 +1,96 @@
+"""
+Robustness runs for the results registry (what notebook 03 used to save).
+
+Lockup windows, placebo lockup days, large vs small IPOs and the
+Goodman-Bacon decomposition, returned as record_many entries with the
+categories the figure stage filters on (see figures.FIGURES).
+"""
+import pandas as pd
+import numpy as np
+from typing import Dict, List, Optional
+
+from .estimators import TWFEEstimator
+
+WINDOW_DAYS = [90, 150, 180, 210, 270]
+PLACEBO_DAYS = [60, 90, 120, 180, 240, 270, 300]
+PLACEBO_DATE_DAYS = list(range(60, 301, 30))
+
+
+def lockup_day_entries(
+    panel: pd.DataFrame,
+    fingerprint: Optional[str] = None,
+    outcome: str = 'Abnormal_Return'
+) -> List[Dict]:
+    """TWFE with Post_Lockup redefined at other days (windows / placebos)."""
+    twfe = TWFEEstimator()
+    days = sorted(set(WINDOW_DAYS) | set(PLACEBO_DAYS) | set(PLACEBO_DATE_DAYS))
+    # Each day is fit once and recorded under every category that uses it
+    results = {}
+    for day in days:
+        df = panel.assign(Post_Lockup=(panel['Days_Since_IPO'] > day).astype(int))
+        results[day] = twfe.estimate(df, outcome=outcome)
+
+    entries = []
+    for category, category_days in [('windows', WINDOW_DAYS), ('placebos', PLACEBO_DAYS),
+                                    ('placebo_dates', PLACEBO_DATE_DAYS)]:
+        for day in category_days:
+            entries.append({
+                'result': results[day], 'label': f'Day {day}', 'category': category,
+                'spec': {'estimator': 'TWFE', 'outcome': outcome, 'treatment': 'Post_Lockup',
+                         'lockup_day': day, 'cov_type': 'clustered'},
+                'fingerprint': fingerprint
+            })
+    return entries
+
+
+def size_entries(
+    panel: pd.DataFrame,
+    fingerprint: Optional[str] = None,
+    outcome: str = 'Abnormal_Return'
+) -> List[Dict]:
+    """Large vs small IPOs, split at the median first-week price x volume."""
+    first_week = panel[panel['Days_Since_IPO'].between(1, 7)]
+    if len(first_week) == 0 or not {'Close', 'Volume'} <= set(panel.columns):
+        return []
+    by_ticker = first_week.groupby('Ticker')
+    size_proxy = by_ticker['Close'].mean() * by_ticker['Volume'].mean()
+    large = panel['Ticker'].map(size_proxy > size_proxy.median()).fillna(False).astype(bool)
+
+    results = TWFEEstimator().estimate_masks(
+        panel, {'Large IPOs': large, 'Small IPOs': ~large}, outcome=outcome
+    )
+    return [
+        {
+            'result': result, 'label': label, 'category': 'size',
+            'spec': {'estimator': 'TWFE', 'outcome': outcome, 'treatment': 'Post_Lockup',
+                     'lockup_day': 180, 'cov_type': 'clustered'},
+            'fingerprint': fingerprint
+        }
+        for label, result in results.items()
+    ]
+
+
+def goodman_bacon_entries(
+    panel: pd.DataFrame,
+    fingerprint: Optional[str] = None,
+    outcome: str = 'Abnormal_Return'
+) -> List[Dict]:
+    """Goodman-Bacon 2x2s on calendar time (first post-lockup session per IPO)."""
+    from .modern_did import GoodmanBacon
+
+    df = panel[['Ticker', 'Date', 'Post_Lockup', outcome]].copy()
+    df['Time_Index'] = pd.factorize(df['Date'], sort=True)[0]
+    first_post = df.loc[df['Post_Lockup'] == 1].groupby('Ticker')['Time_Index'].min()
+    df['Treatment_Time'] = df['Ticker'].map(first_post).astype(float).fillna(np.inf)
+
+    decomp = GoodmanBacon(df, outcome, 'Ticker', 'Time_Index', 'Treatment_Time').decompose()
+    return [
+        {
+            'result': {'coefficient': row['att'], 'weight': row['weight']},
+            'kind': 'bacon', 'label': row['comparison_type'], 'category': 'goodman_bacon',
+            'spec': {'estimator': 'GoodmanBacon', 'outcome': outcome,
+                     'treated_cohort': row['treated_cohort'], 'control_cohort': row['control_cohort']},
+            'fingerprint': fingerprint
+        }
+        for row in decomp.to_dict('records')
+    ]
@@ -0,0 +1,175 @@
+"""
+Warm analysis server - keeps the prepared panel and estimator caches in memory.
+
+Every CLI run pays for imports, CSV parsing and the panel sort before any
+estimation. `python run_analysis.py serve` does that once and answers
+queries over local HTTP (JSON), e.g.
+
+    curl 'localhost:8765/twfe'
+    curl 'localhost:8765/twfe?ticker=SNOW'
+    curl 'localhost:8765/event_study?pre_window=30&post_window=30&bins=-30,-20,-10,0,10,20,30'
+    curl 'localhost:8765/ticker?symbol=SNOW'
+
+Repeated queries come straight from the cache; event-study binning reuses
+the cached daily moments (see EventStudyEstimator.compute_moments).
+Binds to 127.0.0.1 only - no auth, not meant to be exposed.
+"""
+import json
+import math
+import threading
+import pandas as pd
+import numpy as np
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from .estimators import TWFEEstimator, EventStudyEstimator
+
+
+class AnalysisService:
+    """Query layer over a prepared panel. The HTTP handler just routes into this."""
+
+    def __init__(self, panel: pd.DataFrame):
+        self.panel = panel
+        # Panel is sorted by (Ticker, Date) already - slice once, not per query
+        self._by_ticker = {t: df for t, df in panel.groupby('Ticker', sort=False)}
+        self._twfe = TWFEEstimator()
+        self._event_study = EventStudyEstimator()
+        self._cache: Dict = {}
+        self._moments: Dict = {}
+        self._lock = threading.Lock()
+
+    def _ticker_panel(self, ticker: str) -> pd.DataFrame:
+        ticker = ticker.upper()
+        if ticker not in self._by_ticker:
+            raise KeyError(f"Ticker {ticker} not found")
+        return self._by_ticker[ticker]
+
+    def _cached(self, key, compute, cache: Optional[Dict] = None):
+        """compute() once per key; concurrent requests for the same key wait on one Future."""
+        # The lock only guards the dict - the work runs outside it, so
+        # /health and other keys aren't stuck behind a slow estimate
+        cache = self._cache if cache is None else cache
+        with self._lock:
+            future = cache.get(key)
+            owner = future is None
+            if owner:
+                future = cache[key] = Future()
+        if owner:
+            try:
+                future.set_result(compute())
+            except BaseException as exc:
+                # Don't cache failures - the next request retries
+                with self._lock:
+                    del cache[key]
+                future.set_exception(exc)
+        return future.result()
+
+    def twfe(self, ticker: Optional[str] = None) -> Dict:
+        """Main TWFE estimate (or for a single ticker, like the CLI --ticker)."""
+        data = self.panel if ticker is None else self._ticker_panel(ticker)
+        return self._cached(('twfe', ticker), lambda: self._twfe.estimate(data).to_dict())
+
+    def event_study(
+        self,
+        pre_window: int = 30,
+        post_window: int = 30,
+        omit_period: int = -1,
+        bins: Optional[List[int]] = None
+    ) -> List[Dict]:
+        """Daily event-study coefficients, or binned ones from cached moments."""
+        if bins is None:
+            key = ('event_study', pre_window, post_window, omit_period)
+            return self._cached(key, lambda: self._event_study.estimate(
+                self.panel, pre_window=pre_window, post_window=post_window, omit_period=omit_period
+            ).to_dict('records'))
+
+        moments = self._cached((pre_window, post_window, omit_period), lambda: self._event_study.compute_moments(
+            self.panel, pre_window=pre_window, post_window=post_window, omit_period=omit_period
+        ), cache=self._moments)
+        return self._event_study.estimate_binned(moments, bins).to_dict('records')
+
+    def ticker_summary(self, ticker: str) -> Dict:
+        """Quick descriptives for one IPO around its lockup."""
+        df = self._ticker_panel(ticker)
+
+        def _summary():
+            pre = df.loc[df['Post_Lockup'] == 0, 'Abnormal_Return']
+            post = df.loc[df['Post_Lockup'] == 1, 'Abnormal_Return']
+            return {
+                'ticker': ticker.upper(),
+                'n_obs': len(df),
+                'mean_abnormal_return': df['Abnormal_Return'].mean(),
+                'std_abnormal_return': df['Abnormal_Return'].std(),
+                'pre_lockup_obs': len(pre),
+                'post_lockup_obs': len(post),
+                'pre_lockup_mean': pre.mean(),
+                'post_lockup_mean': post.mean(),
+            }
+
+        return self._cached(('ticker', ticker.upper()), _summary)
+
+    def handle(self, path: str, params: Dict[str, str]):
+        """Route a request path + query params to a method."""
+        if path == '/health':
+            return {'status': 'ok', 'n_obs': len(self.panel), 'n_tickers': len(self._by_ticker)}
+        if path == '/twfe':
+            return self.twfe(params.get('ticker'))
+        if path == '/event_study':
+            bins = params.get('bins')
+            return self.event_study(
+                pre_window=int(params.get('pre_window', 30)),
+                post_window=int(params.get('post_window', 30)),
+                omit_period=int(params.get('omit_period', -1)),
+                bins=[int(b) for b in bins.split(',')] if bins else None
+            )
+        if path == '/ticker':
+            if 'symbol' not in params:
+                raise ValueError("Missing 'symbol' parameter")
+            return self.ticker_summary(params['symbol'])
+        raise LookupError(f"Unknown endpoint {path}")
+
+
+def _to_json(obj) -> bytes:
+    """JSON with NaN -> null and numpy scalars unwrapped."""
+    def _clean(x):
+        if isinstance(x, dict):
+            return {k: _clean(v) for k, v in x.items()}
+        if isinstance(x, (list, tuple)):
+            return [_clean(v) for v in x]
+        if isinstance(x, np.generic):
+            x = x.item()
+        if isinstance(x, float) and not math.isfinite(x):
+            return None
+        return x
+
+    return json.dumps(_clean(obj), default=str).encode()
+
+
+def make_server(service: AnalysisService, host: str = '127.0.0.1', port: int = 8765) -> ThreadingHTTPServer:
+    """HTTP server bound to service (port=0 picks a free port)."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            try:
+                body, code = service.handle(url.path, params), 200
+            except LookupError as e:
+                body, code = {'error': str(e).strip("'\"")}, 404
+            except (ValueError, RuntimeError) as e:
+                body, code = {'error': str(e)}, 400
+
+            payload = _to_json(body)
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            # Default handler logs every request to stderr - too noisy
+            pass
+
+    return ThreadingHTTPServer((host, port), Handler)
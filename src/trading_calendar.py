@@ -0,0 +1,149 @@
+"""
+Trading-calendar index: calendar date -> trading-day ordinal.
+
+The panel's Days_Since_IPO > 180 rule is only an approximation - actual
+lockup expirations (from the IPO metadata) fall on arbitrary calendar
+days, sometimes weekends, and some deals have early releases or several
+tranches. With every session in one sorted array, event time for the whole
+panel is a single np.searchsorted instead of per-row date arithmetic.
+
+Sessions come from the dates in the price data (yfinance only has rows for
+days the exchange was open), so no holiday calendar dependency is needed.
+Dates past either end are extrapolated with weekdays.
+"""
+import pandas as pd
+import numpy as np
+from pathlib import Path
+from typing import Iterable
+
+
+class TradingCalendar:
+    """Sorted exchange sessions with vectorized date -> ordinal lookups."""
+
+    def __init__(self, sessions):
+        sessions = pd.DatetimeIndex(sessions).normalize().unique().sort_values()
+        if len(sessions) == 0:
+            raise ValueError("Trading calendar needs at least one session")
+        self.sessions = sessions.values.astype('datetime64[D]')
+
+    @classmethod
+    def from_panel(cls, df: pd.DataFrame, time_var: str = 'Date') -> 'TradingCalendar':
+        return cls(df[time_var].dropna().unique())
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+    def covers(self, dates) -> bool:
+        """True if every date is a session in this calendar."""
+        dates = self._as_days(dates)
+        idx = np.searchsorted(self.sessions, dates)
+        return bool(len(dates) == 0 or ((idx < len(self)) & (self.sessions[np.minimum(idx, len(self) - 1)] == dates)).all())
+
+    def extend(self, dates) -> 'TradingCalendar':
+        """Calendar with extra sessions (e.g. new trading days in a refresh)."""
+        return TradingCalendar(np.union1d(self.sessions, self._as_days(dates)))
+
+    def ordinal(self, dates, roll: str = 'forward') -> np.ndarray:
+        """Trading-day number of each date (first session = 0).
+
+        Non-trading dates roll forward to the next session, or back to the
+        previous one with roll='backward' (a lockup ending on a Saturday was
+        last locked on Friday).
+        """
+        if roll not in ('forward', 'backward'):
+            raise ValueError(f"roll must be 'forward' or 'backward', got '{roll}'")
+        dates = self._as_days(dates)
+        idx = np.searchsorted(self.sessions, dates, side='left')
+        if roll == 'backward':
+            on_session = (idx < len(self)) & (self.sessions[np.minimum(idx, len(self) - 1)] == dates)
+            idx = np.where(on_session, idx, idx - 1)
+
+        # Outside the covered range count weekdays from the nearest end
+        first, last = self.sessions[0], self.sessions[-1]
+        before, after = dates < first, dates > last
+        one_day = np.timedelta64(1, 'D')
+        if before.any():
+            rolled = np.busday_offset(dates[before], 0, roll=roll)
+            idx[before] = -np.busday_count(rolled, first)
+        if after.any():
+            rolled = np.busday_offset(dates[after], 0, roll=roll)
+            idx[after] = len(self) - 1 + np.busday_count(last + one_day, rolled + one_day)
+        return idx.astype(np.int64)
+
+    def offset(self, dates, event_dates) -> np.ndarray:
+        """Trading days from event_dates to dates (0 on the event session)."""
+        return self.ordinal(dates) - self.ordinal(event_dates)
+
+    def save(self, path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.save(path, self.sessions.astype(np.int64))
+
+    @classmethod
+    def load(cls, path) -> 'TradingCalendar':
+        return cls(np.load(path).astype('datetime64[D]'))
+
+    @staticmethod
+    def _as_days(dates) -> np.ndarray:
+        return np.atleast_1d(pd.DatetimeIndex(pd.to_datetime(dates)).values.astype('datetime64[D]'))
+
+
+def lockup_event_time(
+    df: pd.DataFrame,
+    lockups: pd.DataFrame,
+    calendar: TradingCalendar,
+    entity_var: str = 'Ticker',
+    time_var: str = 'Date',
+    lockup_cols: Iterable[str] = ('Lockup_Expiration',)
+) -> pd.DataFrame:
+    """Event time relative to each IPO's actual lockup expiration.
+
+    lockups has one row per IPO (or per tranche) with one or more date
+    columns - e.g. Lockup_Expiration plus an early-release or second-tranche
+    date. Adds:
+      Days_To_Lockup  trading days since the first expiration (0 = last
+                      locked session, like day 180 in the day-180 convention)
+      Post_Lockup     1 from the first unlocked session (Days_To_Lockup > 0)
+      Lockup_Tranche  number of expirations already unlocked by the date
+    Expirations on non-trading days roll back to the previous session, so
+    a Saturday expiry makes Friday day 0 and Monday the first post day.
+    Rows for tickers without lockup dates keep their existing values.
+    """
+    lockup_cols = list(lockup_cols)
+    missing = [c for c in [entity_var] + lockup_cols if c not in lockups.columns]
+    if missing:
+        raise ValueError(f"Missing lockup columns: {missing}")
+
+    tranches = lockups.melt(id_vars=[entity_var], value_vars=lockup_cols, value_name='expiration')
+    tranches = tranches.dropna(subset=['expiration'])
+    tickers = pd.Index(sorted(tranches[entity_var].unique()))
+
+    out = df.copy()
+    row_entity = tickers.get_indexer(out[entity_var])
+    has_lockup = row_entity >= 0
+    if not has_lockup.any():
+        return out
+
+    # One sorted key per (ticker, tranche session) -> tranche counts for
+    # every row with a single searchsorted
+    stride = np.int64(len(calendar) + 1_000_000)
+    tranche_entity = tickers.get_indexer(tranches[entity_var])
+    tranche_ord = calendar.ordinal(tranches['expiration'], roll='backward')
+    keys = np.sort(tranche_entity * stride + tranche_ord)
+    first_ord = pd.Series(tranche_ord).groupby(tranche_entity).min().reindex(range(len(tickers))).to_numpy()
+
+    rows = np.flatnonzero(has_lockup)
+    entity = row_entity[rows]
+    row_ord = calendar.ordinal(out[time_var].to_numpy()[rows])
+    days_to = row_ord - first_ord[entity]
+    n_passed = (
+        np.searchsorted(keys, entity * stride + row_ord, side='left')
+        - np.searchsorted(keys, entity * stride - stride // 2, side='left')
+    )
+
+    for col, values in [('Days_To_Lockup', days_to), ('Post_Lockup', (days_to > 0).astype(int)),
+                        ('Lockup_Tranche', n_passed)]:
+        if col not in out.columns:
+            out[col] = np.nan
+        out.iloc[rows, out.columns.get_loc(col)] = values
+    return out
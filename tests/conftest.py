@@ -0,0 +1,55 @@
+"""
+Shared test fixtures.
+"""
+import pytest
+import pandas as pd
+import numpy as np
+
+
+def _staggered_panel(n_ipos, n_dates, max_start, length, lockup_day, effect, seed):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2020-01-01', periods=n_dates)
+    data = []
+    for i in range(n_ipos):
+        start = int(rng.integers(0, max_start))
+        for days_since_ipo, date in enumerate(dates[start:start + length]):
+            post_lockup = int(days_since_ipo > lockup_day)
+            data.append({
+                'Ticker': f'T{i}',
+                'Date': date,
+                'Days_Since_IPO': days_since_ipo,
+                'Days_To_Lockup': days_since_ipo - lockup_day,
+                'Post_Lockup': post_lockup,
+                'Abnormal_Return': rng.normal(0, 1) + post_lockup * effect
+            })
+    return pd.DataFrame(data)
+
+
+@pytest.fixture
+def make_staggered_panel():
+    """Factory for staggered IPO panels (random IPO dates, one lockup day for all)."""
+    def _make(n_ipos=12, n_dates=140, max_start=40, length=90, lockup_day=60, effect=0.5, seed=0):
+        return _staggered_panel(n_ipos, n_dates, max_start, length, lockup_day, effect, seed)
+    return _make
+
+
+@pytest.fixture
+def staggered_panel_data(make_staggered_panel):
+    """Panel with staggered IPO dates (lockup at day 60 for every firm)."""
+    return make_staggered_panel()
+
+
+@pytest.fixture
+def lockup_panel_data(make_staggered_panel):
+    """Staggered IPO panel with a 0.5 post-lockup effect and no pre-trend."""
+    return make_staggered_panel(n_ipos=20, n_dates=200, max_start=60, length=120, lockup_day=80, seed=3)
+
+
+@pytest.fixture(scope='session')
+def weakly_connected_panel_data():
+    """71 IPOs with lockups spread over ~650 sessions (like the real sample).
+
+    Inside a +/-30 day lockup window each date is shared by only a few
+    IPOs, so iterative demeaning converges very slowly on it.
+    """
+    return _staggered_panel(71, 950, 650, 260, 180, 0.5, 1)
@@ -0,0 +1,179 @@
+"""
+Unit tests for data loading and cleaning.
+"""
+import pytest
+import pandas as pd
+import numpy as np
+from src.data_loader import IPODataLoader
+from src.quantile_sketch import QuantileSketch, ReturnSketches
+
+
+@pytest.fixture
+def raw_panel():
+    """Fat-tailed returns for a few tickers, saved like the processed CSV."""
+    rng = np.random.default_rng(7)
+    frames = []
+    for i, n_days in enumerate([250, 250, 120]):
+        frames.append(pd.DataFrame({
+            'Date': pd.bdate_range('2021-01-04', periods=n_days),
+            'Ticker': f'T{i}',
+            'IPO_Date': pd.Timestamp('2021-01-04'),
+            'Days_Since_IPO': np.arange(n_days),
+            'Abnormal_Return': rng.standard_t(2, n_days) * 3,
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def test_sketch_quantiles_close_to_exact():
+    """Compacted sketch stays within a fraction of a percentile; merge = one big sketch."""
+    rng = np.random.default_rng(0)
+    values = rng.standard_t(3, 200_000)
+
+    one = QuantileSketch().update(values)
+    merged = QuantileSketch().update(values[:70_000]).merge(QuantileSketch().update(values[70_000:]))
+    qs = [0.01, 0.5, 0.99]
+    for sketch in (one, merged):
+        ranks = np.searchsorted(np.sort(values), sketch.quantile(qs)) / len(values)
+        np.testing.assert_allclose(ranks, qs, atol=0.005)
+
+    # Small groups never compact -> exact
+    small = values[:200]
+    assert QuantileSketch().update(small).quantile(0.99) == np.quantile(small, 0.99, method='inverted_cdf')
+
+
+def test_prepare_panel_winsorizes_per_ticker(raw_panel):
+    loader = IPODataLoader()
+    clean = loader.prepare_panel_data(raw_panel, winsorize_quantiles=(0.01, 0.99))
+
+    for ticker, df in raw_panel.groupby('Ticker'):
+        lo, hi = np.quantile(df['Abnormal_Return'], [0.01, 0.99], method='inverted_cdf')
+        got = clean.loc[clean['Ticker'] == ticker, 'Abnormal_Return']
+        assert got.min() == pytest.approx(lo)
+        assert got.max() == pytest.approx(hi)
+    assert len(clean) == len(raw_panel)
+
+    trimmed = loader.prepare_panel_data(raw_panel, winsorize_quantiles=(0.01, 0.99), trim=True)
+    assert len(trimmed) < len(raw_panel)
+
+
+def test_global_winsorize_clips_new_tickers(raw_panel):
+    """Global cutoffs also apply to IPOs that aren't in the sketches yet."""
+    from src.quantile_sketch import winsorize
+
+    sketches = ReturnSketches().update(raw_panel[raw_panel['Ticker'] != 'T2'])
+    lo, hi = sketches.global_sketch.quantile([0.05, 0.95])
+
+    clipped = winsorize(raw_panel, sketches, (0.05, 0.95), by='global')
+    new = clipped.loc[clipped['Ticker'] == 'T2', 'Abnormal_Return']
+    assert new.min() == pytest.approx(lo) and new.max() == pytest.approx(hi)
+
+    trimmed = winsorize(raw_panel, sketches, (0.05, 0.95), by='global', trim=True)
+    assert trimmed['Abnormal_Return'].between(lo, hi).all()
+    # Per-ticker cutoffs still leave unseen tickers alone
+    per_ticker = winsorize(raw_panel, sketches, (0.05, 0.95), by='ticker')
+    pd.testing.assert_series_equal(
+        per_ticker.loc[per_ticker['Ticker'] == 'T2', 'Abnormal_Return'],
+        raw_panel.loc[raw_panel['Ticker'] == 'T2', 'Abnormal_Return']
+    )
+
+
+def test_sketches_persist_and_only_add_new_rows(raw_panel, tmp_path):
+    """Chunked build + refresh with overlapping data matches one full pass."""
+    loader = IPODataLoader(data_dir=tmp_path)
+    path = tmp_path / 'sketches.json'
+
+    old = raw_panel[raw_panel['Date'] < '2021-06-01']
+    loader.update_return_sketches([old.iloc[i::4] for i in range(4)], path=path)
+    # Refresh with the full file - old rows must not be counted twice
+    refreshed = loader.update_return_sketches(raw_panel, path=path)
+
+    full = ReturnSketches().update(raw_panel)
+    assert refreshed.global_sketch.count == len(raw_panel)
+    pd.testing.assert_frame_equal(refreshed.bounds((0.05, 0.95)), full.bounds((0.05, 0.95)))
+
+
+def test_actual_lockups_use_trading_days(raw_panel, tmp_path):
+    """Event time counts sessions from each IPO's own (weekend-rolled) lockup date."""
+    loader = IPODataLoader(data_dir=tmp_path)
+    panel = raw_panel[raw_panel['Date'] != '2021-02-15']  # a holiday - not a session
+    panel = loader._add_lockup_vars(panel.copy())
+    lockups = pd.DataFrame({
+        'Ticker': ['T0', 'T1'],
+        'Lockup_Expiration': pd.to_datetime(['2021-03-06', '2021-02-12']),  # Sat; Fri
+        'Early_Release': pd.to_datetime([None, '2021-02-01']),
+    })
+
+    out = loader.add_actual_lockups(panel, lockups, lockup_cols=('Lockup_Expiration', 'Early_Release'))
+
+    t0 = out[out['Ticker'] == 'T0'].set_index('Date')
+    # Saturday expiry -> Friday is the last locked session, Monday the first unlocked
+    assert t0.loc['2021-03-05', 'Days_To_Lockup'] == 0
+    assert t0.loc['2021-03-05', 'Post_Lockup'] == 0
+    assert t0.loc['2021-03-08', 'Days_To_Lockup'] == 1
+    assert t0.loc['2021-03-08', 'Post_Lockup'] == 1
+    assert t0.loc['2021-03-04', 'Days_To_Lockup'] == -1
+
+    # Early release comes first; holiday is skipped when counting
+    t1 = out[out['Ticker'] == 'T1'].set_index('Date')
+    assert t1.loc['2021-02-12', 'Days_To_Lockup'] == 9
+    assert t1.loc['2021-02-16', 'Days_To_Lockup'] == 10
+    assert t1.loc['2021-02-12', 'Lockup_Tranche'] == 1
+    assert t1.loc['2021-02-16', 'Lockup_Tranche'] == 2
+
+    # No metadata for T2 -> day-180 values left alone
+    t2 = out[out['Ticker'] == 'T2']
+    pd.testing.assert_series_equal(t2['Days_To_Lockup'], panel.loc[t2.index, 'Days_To_Lockup'])
+
+    # Calendar is cached next to the processed data
+    assert (tmp_path / 'processed' / 'trading_calendar.npy').exists()
+    assert len(loader.load_trading_calendar()) == panel['Date'].nunique()
+
+
+def test_partitioned_load_matches_single_file(raw_panel, tmp_path):
+    """Cohort partitions + manifest; cohort filter only reads matching files."""
+    panel = raw_panel.copy()
+    panel.loc[panel['Ticker'] == 'T2', 'IPO_Date'] = pd.Timestamp('2020-11-02')
+    (tmp_path / 'processed').mkdir()
+    panel.to_csv(tmp_path / 'processed' / 'stock_prices_ipo_adjusted.csv', index=False)
+
+    loader = IPODataLoader(data_dir=tmp_path)
+    single = loader.load_stock_data()
+    manifest = loader.partition_stock_data()
+
+    assert [p['key'] for p in manifest['partitions']] == ['2020', '2021']
+    assert sum(p['n_rows'] for p in manifest['partitions']) == len(panel)
+    assert manifest['partitions'][0]['date_max'] == str(panel.loc[panel['Ticker'] == 'T2', 'Date'].max().date())
+
+    parted = loader.load_stock_data(max_workers=2)
+    key = ['Ticker', 'Date']
+    pd.testing.assert_frame_equal(
+        parted.sort_values(key).reset_index(drop=True), single.sort_values(key).reset_index(drop=True)
+    )
+
+    # Drop the 2020 file - a 2021-only load must not need it
+    (tmp_path / 'processed' / 'stock_prices_ipo_adjusted' / 'ipo_year=2020.csv').unlink()
+    only_2021 = loader.load_stock_data(cohorts=[2021])
+    assert set(only_2021['Ticker']) == {'T0', 'T1'}
+
+
+def test_cohort_filter_same_for_csv_and_partitions(raw_panel, tmp_path):
+    """Year/quarter cohort filters agree across storage; a refreshed CSV wins over old partitions."""
+    panel = raw_panel.copy()
+    panel.loc[panel['Ticker'] == 'T1', 'IPO_Date'] = pd.Timestamp('2021-08-02')
+    panel.loc[panel['Ticker'] == 'T2', 'IPO_Date'] = pd.Timestamp('2020-11-02')
+    csv = tmp_path / 'processed' / 'stock_prices_ipo_adjusted.csv'
+    csv.parent.mkdir()
+    panel.to_csv(csv, index=False)
+
+    loader = IPODataLoader(data_dir=tmp_path)
+    cohorts = ['2020', '2021Q3']
+    assert set(loader.load_stock_data(cohorts=cohorts)['Ticker']) == {'T1', 'T2'}
+    for by in ('year', 'quarter'):
+        loader.partition_stock_data(by=by)
+        assert set(loader.load_stock_data(cohorts=cohorts)['Ticker']) == {'T1', 'T2'}
+
+    # CSV refreshed after partitioning -> partitions are stale
+    panel[panel['Ticker'] != 'T2'].to_csv(csv, index=False)
+    with pytest.warns(UserWarning, match="partition"):
+        refreshed = loader.load_stock_data()
+    assert set(refreshed['Ticker']) == {'T0', 'T1'}
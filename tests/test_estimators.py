@@ -4,7 +4,7 @@ Unit tests for DiD estimators.
 import pytest
 import pandas as pd
 import numpy as np
-from src.estimators import TWFEEstimator, EventStudyEstimator, test_parallel_trends
+from src.estimators import TWFEEstimator, EventStudyEstimator, OnlineTWFEState, test_parallel_trends
 
 
 @pytest.fixture
@@ -125,3 +125,315 @@ def test_did_result_dataclass():
     result_dict = result.to_dict()
     assert isinstance(result_dict, dict)
     assert result_dict['coefficient'] == 0.5
+
+
+def test_event_study_reports_absorbed_periods(staggered_panel_data, sample_panel_data):
+    """Absorbed dummies are found up front and flagged in the output."""
+    estimator = EventStudyEstimator()
+
+    # No never-treated units -> one period is collinear with the FE; like
+    # PanelOLS(drop_absorbed=True) that's the last one
+    results = estimator.estimate(staggered_panel_data, pre_window=20, post_window=20)
+    assert results.attrs['absorbed_periods'] == [20]
+    assert results.loc[results['absorbed'], 'coefficient'].isna().all()
+    assert results.loc[~results['absorbed'], 'coefficient'].notna().all()
+
+    # Same event date for every firm -> time FE absorb every dummy
+    results = estimator.estimate(sample_panel_data, pre_window=20, post_window=20)
+    assert results['absorbed'].sum() == len(results) - 1
+
+
+def test_event_study_matches_drop_absorbed_fit(staggered_panel_data):
+    """Pre-pass keeps PanelOLS(drop_absorbed=True)'s normalization."""
+    import warnings
+    from linearmodels.panel import PanelOLS
+
+    results = EventStudyEstimator().estimate(staggered_panel_data, pre_window=20, post_window=20)
+
+    df = staggered_panel_data[staggered_panel_data['Days_To_Lockup'].between(-20, 20)].copy()
+    names = [f'event_{t}' for t in range(-20, 21) if t != -1]
+    for name in names:
+        df[name] = (df['Days_To_Lockup'] == int(name[len('event_'):])).astype(int)
+    df = df.set_index(['Ticker', 'Date'])
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        refit = PanelOLS(
+            df['Abnormal_Return'], df[names], entity_effects=True, time_effects=True,
+            drop_absorbed=True, check_rank=False
+        ).fit(cov_type='clustered', cluster_entity=True)
+
+    est = results.set_index('event_time')
+    assert sorted(set(names) - set(refit.params.index)) == ['event_20']
+    for name in refit.params.index:
+        t = int(name[len('event_'):])
+        assert est.loc[t, 'coefficient'] == pytest.approx(refit.params[name], abs=1e-10)
+        assert est.loc[t, 'std_error'] == pytest.approx(refit.std_errors[name], abs=1e-10)
+
+
+def test_binned_event_study_matches_daily_fit(staggered_panel_data):
+    """One-day bins from cached moments reproduce the daily PanelOLS fit."""
+    estimator = EventStudyEstimator()
+    daily = estimator.estimate(staggered_panel_data, pre_window=20, post_window=20)
+
+    moments = estimator.compute_moments(staggered_panel_data, pre_window=20, post_window=20)
+    binned = estimator.estimate_binned(moments, list(range(-20, 22)))
+
+    np.testing.assert_allclose(binned['coefficient'], daily['coefficient'], atol=1e-8)
+    np.testing.assert_allclose(binned['std_error'], daily['std_error'], atol=1e-6)
+    assert binned.attrs['absorbed_periods'] == daily.attrs['absorbed_periods']
+
+
+def test_binned_event_study_matches_refit(staggered_panel_data):
+    """Coarse bins give the same answer as refitting on bin dummies."""
+    from linearmodels.panel import PanelOLS
+
+    estimator = EventStudyEstimator()
+    binned = estimator.estimate(
+        staggered_panel_data, pre_window=20, post_window=20, bins=[-20, -10, 0, 10, 20]
+    )
+
+    df = staggered_panel_data[staggered_panel_data['Days_To_Lockup'].between(-20, 20)].copy()
+    for lo, hi in [(-20, -10), (0, 10)]:
+        df[f'bin_{lo}'] = df['Days_To_Lockup'].between(lo, hi - 1).astype(int)
+    df['bin_10'] = df['Days_To_Lockup'].between(10, 20).astype(int)
+    df = df.set_index(['Ticker', 'Date'])
+    refit = PanelOLS(
+        df['Abnormal_Return'], df[['bin_-20', 'bin_0', 'bin_10']],
+        entity_effects=True, time_effects=True
+    ).fit(cov_type='clustered', cluster_entity=True)
+
+    est = binned.set_index('bin_start')
+    for lo in [-20, 0, 10]:
+        assert est.loc[lo, 'coefficient'] == pytest.approx(refit.params[f'bin_{lo}'], abs=1e-8)
+        assert est.loc[lo, 'std_error'] == pytest.approx(refit.std_errors[f'bin_{lo}'], abs=1e-6)
+    assert est.loc[-10, 'coefficient'] == 0.0
+
+
+def test_twoway_clustered_ses_match_panelols(staggered_panel_data):
+    """cov_type='twoway' gives PanelOLS's entity + date clustered SEs."""
+    from linearmodels.panel import PanelOLS
+
+    df = staggered_panel_data.set_index(['Ticker', 'Date'])
+    refit = PanelOLS(
+        df['Abnormal_Return'], df[['Post_Lockup']], entity_effects=True, time_effects=True
+    ).fit(cov_type='clustered', cluster_entity=True, cluster_time=True)
+
+    result = TWFEEstimator().estimate(staggered_panel_data, cov_type='twoway')
+    assert result.coefficient == pytest.approx(refit.params['Post_Lockup'], abs=1e-10)
+    assert result.std_error == pytest.approx(refit.std_errors['Post_Lockup'], abs=1e-8)
+    assert result.p_value == pytest.approx(refit.pvalues['Post_Lockup'], abs=1e-8)
+    assert result.r_squared == pytest.approx(refit.rsquared_within, abs=1e-10)
+
+    # Event study: every bin's SE from the same score sums
+    binned = EventStudyEstimator().estimate(
+        staggered_panel_data, pre_window=20, post_window=20, bins=[-20, -10, 0, 10, 20], cov_type='twoway'
+    )
+    window = staggered_panel_data[staggered_panel_data['Days_To_Lockup'].between(-20, 20)].copy()
+    for lo, hi in [(-20, -11), (0, 9), (10, 20)]:
+        window[f'bin_{lo}'] = window['Days_To_Lockup'].between(lo, hi).astype(int)
+    window = window.set_index(['Ticker', 'Date'])
+    refit = PanelOLS(
+        window['Abnormal_Return'], window[['bin_-20', 'bin_0', 'bin_10']],
+        entity_effects=True, time_effects=True
+    ).fit(cov_type='clustered', cluster_entity=True, cluster_time=True)
+
+    est = binned.set_index('bin_start')
+    for lo in [-20, 0, 10]:
+        assert est.loc[lo, 'std_error'] == pytest.approx(refit.std_errors[f'bin_{lo}'], abs=1e-8)
+
+    with pytest.raises(ValueError, match="cov_type"):
+        TWFEEstimator().estimate(staggered_panel_data, cov_type='robust')
+
+
+def test_online_twfe_matches_full_refit(staggered_panel_data, tmp_path):
+    """Daily updates give the full-sample coefficient; refit gives its SE too."""
+    data = staggered_panel_data
+    dates = sorted(data['Date'].unique())
+    estimator = TWFEEstimator()
+    full = estimator.estimate(data)
+
+    state = estimator.start_online(data[data['Date'] < dates[-10]], refit_every=5)
+    for date in dates[-10:]:
+        result = state.update(data[data['Date'] == date])
+
+    assert result.coefficient == pytest.approx(full.coefficient, abs=1e-10)
+    assert result.r_squared == pytest.approx(full.r_squared, abs=1e-10)
+    assert result.n_obs == full.n_obs
+    assert result.std_error == pytest.approx(full.std_error, rel=0.1)
+    assert state.needs_refit
+
+    # Persisted state picks up where it left off
+    state.save(tmp_path / 'twfe_state.npz')
+    loaded = OnlineTWFEState.load(tmp_path / 'twfe_state.npz')
+    assert loaded.result().coefficient == pytest.approx(full.coefficient, abs=1e-10)
+    with pytest.raises(ValueError, match="already folded in"):
+        loaded.update(data[data['Date'] == dates[-1]])
+
+    refit = state.refit(data)
+    assert refit.std_error == pytest.approx(full.std_error, abs=1e-10)
+    assert not state.needs_refit
+
+
+def test_online_twfe_new_tickers_and_failed_updates(staggered_panel_data, monkeypatch):
+    """A ticker first seen in an update is folded in exactly; a failed update changes nothing."""
+    data = staggered_panel_data
+    dates = sorted(data['Date'].unique())
+    late = data[data['Ticker'] == 'T0'].assign(Ticker='NEW')
+    late = late[late['Date'] >= dates[-10]]
+    full = TWFEEstimator().estimate(pd.concat([data, late], ignore_index=True))
+
+    state = TWFEEstimator().start_online(data[data['Date'] < dates[-10]])
+    before = state.result()
+
+    def _fail(self):
+        raise RuntimeError("TWFE regression failed")
+
+    with monkeypatch.context() as m:
+        m.setattr(OnlineTWFEState, '_solve', _fail)
+        with pytest.raises(RuntimeError):
+            state.update(pd.concat([data[data['Date'] == dates[-10]], late[late['Date'] == dates[-10]]]))
+    assert 'NEW' not in state.entities
+    assert state.result().coefficient == before.coefficient
+    assert state.result().n_obs == before.n_obs
+
+    for date in dates[-10:]:
+        result = state.update(pd.concat([data[data['Date'] == date], late[late['Date'] == date]]))
+    assert result.coefficient == pytest.approx(full.coefficient, abs=1e-10)
+    assert result.n_entities == full.n_entities
+
+
+def test_jackknife_matches_leave_one_out_refits(staggered_panel_data):
+    """Closed-form downdates give the same coefficients as dropping each IPO and refitting."""
+    estimator = TWFEEstimator()
+    jk = estimator.jackknife(staggered_panel_data)
+    full = estimator.estimate(staggered_panel_data)
+
+    assert jk.coefficient == pytest.approx(full.coefficient, abs=1e-10)
+    assert jk.std_error == pytest.approx(full.std_error, abs=1e-10)
+
+    influence = jk.influence.set_index('Ticker')
+    for ticker in ['T0', 'T7', influence.index[0]]:
+        refit = estimator.estimate(staggered_panel_data[staggered_panel_data['Ticker'] != ticker])
+        assert influence.loc[ticker, 'coefficient_without'] == pytest.approx(refit.coefficient, abs=1e-10)
+
+    without = influence['coefficient_without']
+    n = len(without)
+    assert jk.jackknife_se == pytest.approx(np.sqrt((n - 1) / n * ((without - without.mean()) ** 2).sum()))
+    assert influence['leverage'].sum() == pytest.approx(1.0)  # trace of the hat matrix = k
+    assert set(jk.flagged) == set(influence.index[influence['high_leverage'] | influence['high_influence']])
+
+
+def test_estimate_masks_matches_filtered_refits(staggered_panel_data, weakly_connected_panel_data):
+    """Each mask gives the same DiDResult as estimate() on the filtered copy."""
+    data = staggered_panel_data
+    masks = {
+        'drop_two_ipos': ~data['Ticker'].isin(['T0', 'T3']),
+        'skip_first_30_days': data['Days_Since_IPO'] >= 30,
+        'first_half_of_sample': data['Date'] < data['Date'].quantile(0.6),
+        'event_window': data['Days_To_Lockup'].between(-40, 40),
+    }
+    estimator = TWFEEstimator()
+
+    for cov_type in ['clustered', 'twoway']:
+        results = estimator.estimate_masks(data, masks, cov_type=cov_type, max_workers=2)
+        assert list(results) == list(masks)
+        for name, mask in masks.items():
+            refit = estimator.estimate(data[mask], cov_type=cov_type)
+            got = results[name]
+            assert got.coefficient == pytest.approx(refit.coefficient, abs=1e-10)
+            assert got.std_error == pytest.approx(refit.std_error, abs=1e-10)
+            assert got.r_squared == pytest.approx(refit.r_squared, abs=1e-10)
+            assert (got.n_obs, got.n_entities) == (refit.n_obs, refit.n_entities)
+
+    # List in, list out
+    as_list = estimator.estimate_masks(data, np.vstack([m.to_numpy() for m in masks.values()]))
+    assert as_list[0].coefficient == pytest.approx(results['drop_two_ipos'].coefficient)
+
+    with pytest.raises(ValueError, match="rows"):
+        estimator.estimate_masks(data, [np.ones(5, dtype=bool)])
+
+    # Event window on lockups spread over years - a weakly connected subsample
+    wide = weakly_connected_panel_data
+    window = wide['Days_To_Lockup'].between(-40, 40)
+    for cov_type in ['clustered', 'twoway']:
+        got = estimator.estimate_masks(wide, [window], cov_type=cov_type)[0]
+        refit = estimator.estimate(wide[window], cov_type=cov_type)
+        assert got.coefficient == pytest.approx(refit.coefficient, abs=1e-10)
+        assert got.std_error == pytest.approx(refit.std_error, abs=1e-10)
+
+
+def test_per_entity_effects_match_groupby(staggered_panel_data):
+    """Vectorized per-IPO contrasts equal a plain per-ticker loop."""
+    from scipy import stats
+    from src.estimators import per_entity_lockup_effects
+
+    results = per_entity_lockup_effects(staggered_panel_data).set_index('Ticker')
+    assert len(results) == staggered_panel_data['Ticker'].nunique()
+    assert results['coefficient'].is_monotonic_decreasing
+
+    for ticker, df in staggered_panel_data.groupby('Ticker'):
+        pre = df.loc[df['Post_Lockup'] == 0, 'Abnormal_Return']
+        post = df.loc[df['Post_Lockup'] == 1, 'Abnormal_Return']
+        se = np.sqrt(pre.var() / len(pre) + post.var() / len(post))
+        assert results.loc[ticker, 'coefficient'] == pytest.approx(post.mean() - pre.mean())
+        assert results.loc[ticker, 'std_error'] == pytest.approx(se)
+        welch = stats.ttest_ind(post, pre, equal_var=False)
+        assert results.loc[ticker, 'p_value'] == pytest.approx(welch.pvalue)
+
+
+def test_demean_twoway_is_exact(staggered_panel_data):
+    """Same residuals as a regression on entity and date dummies, masked or disconnected."""
+    from src.panel_ops import encode_panel, demean_twoway
+
+    data = staggered_panel_data[staggered_panel_data['Ticker'].isin(['T0', 'T1', 'T2', 'T3'])].copy()
+    # T3 moved to later dates nobody else trades on -> two disconnected parts
+    t3 = data['Ticker'] == 'T3'
+    data.loc[t3, 'Date'] += pd.offsets.BDay(300)
+    codes = encode_panel(data)
+    y = data['Abnormal_Return'].to_numpy()
+    mask = data['Days_Since_IPO'].to_numpy() % 3 != 0
+
+    for rows in (np.ones(len(data), dtype=bool), mask):
+        sub_e, sub_t = codes.entity_codes[rows], codes.time_codes[rows]
+        dummies = np.hstack([np.eye(codes.n_entities)[sub_e], np.eye(codes.n_times)[sub_t]])
+        expected = y[rows] - dummies @ np.linalg.lstsq(dummies, y[rows], rcond=None)[0]
+        resid = demean_twoway(y, codes.entity_codes, codes.time_codes, mask=None if rows.all() else rows)
+        np.testing.assert_allclose(resid[rows], expected, atol=1e-10)
+        assert (resid[~rows] == 0).all()
+
+
+def test_binned_event_study_exact_on_weakly_connected_panel(weakly_connected_panel_data):
+    """Lockups spread over years: one-day bins still reproduce the daily fit, absorbed day included."""
+    estimator = EventStudyEstimator()
+    daily = estimator.estimate(weakly_connected_panel_data, pre_window=30, post_window=30)
+    moments = estimator.compute_moments(weakly_connected_panel_data, pre_window=30, post_window=30)
+    binned = estimator.estimate_binned(moments, list(range(-30, 32)))
+
+    assert daily.attrs['absorbed_periods'] == [30]
+    assert binned.attrs['absorbed_periods'] == [30]
+    np.testing.assert_allclose(binned['coefficient'], daily['coefficient'], atol=1e-8)
+    np.testing.assert_allclose(binned['std_error'], daily['std_error'], atol=1e-6)
+
+
+def test_daily_twoway_event_study_matches_panelols(weakly_connected_panel_data):
+    """Daily cov_type='twoway' coefficients and SEs equal PanelOLS two-way clustering."""
+    from linearmodels.panel import PanelOLS
+
+    data = weakly_connected_panel_data
+    es = EventStudyEstimator().estimate(data, pre_window=30, post_window=30, cov_type='twoway')
+    assert es.attrs['absorbed_periods'] == [30]
+
+    window = data[data['Days_To_Lockup'].between(-30, 30)].copy()
+    kept = [t for t in range(-30, 30) if t != -1]
+    for t in kept:
+        window[f'event_{t}'] = (window['Days_To_Lockup'] == t).astype(int)
+    window = window.set_index(['Ticker', 'Date'])
+    refit = PanelOLS(
+        window['Abnormal_Return'], window[[f'event_{t}' for t in kept]],
+        entity_effects=True, time_effects=True
+    ).fit(cov_type='clustered', cluster_entity=True, cluster_time=True)
+
+    est = es.set_index('event_time').loc[kept]
+    names = [f'event_{t}' for t in kept]
+    np.testing.assert_allclose(est['coefficient'], refit.params[names], atol=1e-10)
+    np.testing.assert_allclose(est['std_error'], refit.std_errors[names], atol=1e-8)
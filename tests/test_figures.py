@@ -0,0 +1,124 @@
+"""
+Unit tests for the headless figure stage.
+"""
+import pytest
+from src.estimators import DiDResult
+from src.results_registry import ResultsRegistry
+from src import figures
+
+
+def _record_windows(registry, coefs):
+    registry.record_many([
+        {
+            'result': DiDResult(c, 0.1, c / 0.1, 0.01, c - 0.2, c + 0.2, 1000, 71, 0.01, 'TWFE'),
+            'spec': {'lockup_day': day}, 'label': f'Day {day}', 'category': 'windows'
+        }
+        for day, c in zip([90, 180], coefs)
+    ])
+
+
+@pytest.fixture
+def fake_writer(monkeypatch):
+    """Record what would be rendered instead of calling plotly/kaleido."""
+    rendered = []
+
+    def _render_one(name, rows, style, path):
+        rendered.append(name)
+        open(path, 'w').close()
+        return path
+
+    monkeypatch.setattr(figures, '_render_one', _render_one)
+    monkeypatch.setattr(figures, 'ProcessPoolExecutor', _InlinePool)
+    return rendered
+
+
+class _InlinePool:
+    """Stand-in for the process pool so the monkeypatched worker is used."""
+    def __init__(self, max_workers=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def submit(self, fn, *args):
+        from concurrent.futures import Future
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+
+def test_figures_skip_unchanged_inputs(tmp_path, fake_writer):
+    """Second render with same results and style does nothing."""
+    registry = ResultsRegistry(tmp_path / 'registry.sqlite')
+    _record_windows(registry, [0.1, 0.45])
+
+    status = figures.render_figures(registry, tmp_path / 'figs', names=['time_windows', 'placebo_tests'])
+    assert status == {'time_windows': 'rendered', 'placebo_tests': 'no data'}
+
+    # Re-recording identical numbers (new run ids) doesn't trigger a redraw
+    _record_windows(registry, [0.1, 0.45])
+    status = figures.render_figures(registry, tmp_path / 'figs', names=['time_windows'])
+    assert status == {'time_windows': 'unchanged'}
+
+    # New numbers or a new style do
+    _record_windows(registry, [0.1, 0.50])
+    assert figures.render_figures(registry, tmp_path / 'figs', names=['time_windows'])['time_windows'] == 'rendered'
+    status = figures.render_figures(registry, tmp_path / 'figs', names=['time_windows'], style={'height': 700})
+    assert status['time_windows'] == 'rendered'
+    assert fake_writer == ['time_windows'] * 3
+
+
+def test_figures_rejects_unknown_names(tmp_path):
+    registry = ResultsRegistry(tmp_path / 'registry.sqlite')
+    with pytest.raises(ValueError):
+        figures.render_figures(registry, tmp_path / 'figs', names=['nope'])
+
+
+def test_robustness_runs_feed_every_figure(tmp_path, fake_writer):
+    """run_analysis --robustness entries + the event study cover all registry figures."""
+    import numpy as np
+    import pandas as pd
+    from src.estimators import EventStudyEstimator
+    from src.robustness import lockup_day_entries, size_entries, goodman_bacon_entries
+
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range('2020-01-01', periods=460)
+    frames = []
+    for i in range(6):
+        start = 20 * i
+        n = 330
+        frames.append(pd.DataFrame({
+            'Ticker': f'T{i}', 'Date': dates[start:start + n], 'Days_Since_IPO': np.arange(n),
+            'Post_Lockup': (np.arange(n) > 180).astype(int), 'Days_To_Lockup': np.arange(n) - 180,
+            'Abnormal_Return': rng.normal(size=n), 'Close': 10.0 + i, 'Volume': 1e5 * (i + 1),
+        }))
+    panel = pd.concat(frames, ignore_index=True)
+
+    registry = ResultsRegistry(tmp_path / 'registry.sqlite')
+    registry.record_many(
+        lockup_day_entries(panel, 'fp') + size_entries(panel, 'fp') + goodman_bacon_entries(panel, 'fp')
+    )
+    registry.record_event_study(EventStudyEstimator().estimate(panel, pre_window=10, post_window=10), fingerprint='fp')
+
+    status = figures.render_figures(registry, tmp_path / 'figs')
+    assert status == {name: 'rendered' for name in figures.FIGURES}
+    assert registry.query(kind='bacon')['weight'].notna().all()
+
+
+def test_figures_use_one_data_version(tmp_path):
+    """Bars from an older panel aren't mixed into a chart of the new one."""
+    registry = ResultsRegistry(tmp_path / 'registry.sqlite')
+    result = DiDResult(0.1, 0.1, 1.0, 0.01, -0.1, 0.3, 1000, 71, 0.01, 'TWFE')
+    registry.record_many([
+        {'result': result, 'label': f'Day {day}', 'spec': {'lockup_day': day},
+         'category': 'windows', 'fingerprint': 'old'}
+        for day in (90, 150, 180)
+    ])
+    registry.record(result, spec={'lockup_day': 180}, label='Day 180', category='windows', fingerprint='new')
+
+    rows = figures._input_rows(registry, figures.FIGURES['time_windows'])
+    assert rows['label'].tolist() == ['Day 180']
+    assert (rows['data_fingerprint'] == 'new').all()
@@ -0,0 +1,88 @@
+"""
+Tests for the honest DiD sensitivity analysis.
+"""
+import pytest
+import pandas as pd
+import numpy as np
+from src.estimators import EventStudyEstimator
+from src.honest_did import honest_did, sup_t_critical_value
+
+
+def _event_study(pre, post, se=0.1):
+    """Event-study table shaped like EventStudyEstimator output (reference period -1)."""
+    times = list(range(-len(pre) - 1, -1)) + list(range(0, len(post)))
+    coefs = list(pre) + list(post)
+    table = pd.DataFrame({
+        'event_time': times + [-1],
+        'coefficient': coefs + [0.0],
+        'std_error': [se] * len(times) + [0.0],
+        'absorbed': False,
+    }).sort_values('event_time')
+    table.attrs['cov'] = {'periods': times, 'matrix': (np.eye(len(times)) * se ** 2).tolist()}
+    return table
+
+
+def test_no_pretrend_identified_set_and_ci():
+    """Flat pre-period: M=0 pins the effect down; sets only widen with M."""
+    es = _event_study(pre=[0.0] * 5, post=[1.0, 1.0, 1.0])
+    grid = np.linspace(0, 2, 21)
+
+    rm = honest_did(es, m_grid=grid, restriction='relative_magnitudes')
+    crit = rm.attrs['critical_value']
+    assert crit == pytest.approx(sup_t_critical_value(np.eye(8) * 0.01))
+    first = rm.iloc[0]
+    assert first['id_lower'] == pytest.approx(1.0) and first['id_upper'] == pytest.approx(1.0)
+    # Pre-period box still allows some violation, so the CI is wider than beta_0 +/- crit * se
+    assert first['ci_lower'] <= 1.0 - crit * 0.1 + 1e-9
+
+    sd = honest_did(es, m_grid=grid, restriction='smoothness')
+    assert sd.iloc[0]['id_lower'] == pytest.approx(1.0)
+    assert sd.iloc[0]['id_upper'] == pytest.approx(1.0)
+    for out in (rm, sd):
+        assert (np.diff(out['ci_upper']) >= -1e-9).all()
+        assert (np.diff(out['ci_lower']) <= 1e-9).all()
+        assert out.attrs['breakdown_M'] > 0
+
+
+def test_smoothness_extrapolates_linear_pretrend():
+    """SD(0) allows exactly a linear continuation of the pre-trend."""
+    slope = 0.1
+    pre = [slope * (t + 1) for t in range(-6, -1)]  # delta_{-1} = 0 continues the line
+    post = [2.0 + slope * (t + 1) for t in range(3)]
+    out = honest_did(_event_study(pre, post), m_grid=[0.0], restriction='smoothness', target='average')
+    assert out.loc[0, 'id_lower'] == pytest.approx(2.0)
+    assert out.loc[0, 'id_upper'] == pytest.approx(2.0)
+
+
+def test_runs_on_estimator_output(lockup_panel_data):
+    es = EventStudyEstimator().estimate(lockup_panel_data, pre_window=10, post_window=10)
+    out = honest_did(es, m_grid=np.linspace(0, 1, 5), restriction='relative_magnitudes', target='average')
+    assert len(out) == 5
+    assert out['ci_lower'].notna().all()
+
+    with pytest.raises(ValueError, match="restriction"):
+        honest_did(es, restriction='bounded')
+
+
+def test_value_path_matches_per_m_solves(lockup_panel_data, monkeypatch):
+    """Bounds traced from a few LPs equal one linprog per M."""
+    import functools
+    import scipy.optimize
+    import src.honest_did as hd
+
+    es = EventStudyEstimator().estimate(lockup_panel_data, pre_window=8, post_window=8)
+    grid = np.linspace(0, 0.5, 101)
+    solves = []
+    linprog = scipy.optimize.linprog
+    monkeypatch.setattr(scipy.optimize, 'linprog', lambda *a, **k: solves.append(1) or linprog(*a, **k))
+
+    for restriction in ('smoothness', 'relative_magnitudes'):
+        solves.clear()
+        traced = honest_did(es, m_grid=grid, restriction=restriction, target='average')
+        # 4 bounds x 101 grid points one LP at a time
+        assert len(solves) < len(grid)
+        with monkeypatch.context() as m:
+            m.setattr(hd, '_lp_value_path', functools.partial(hd._lp_value_path, max_solves=-1))
+            direct = honest_did(es, m_grid=grid, restriction=restriction, target='average')
+        assert traced['ci_lower'].notna().all()
+        pd.testing.assert_frame_equal(traced, direct, rtol=1e-7, atol=1e-9)
@@ -0,0 +1,99 @@
+"""
+Unit tests for the results registry.
+"""
+import pytest
+import pandas as pd
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from src.estimators import DiDResult
+from src.results_registry import ResultsRegistry, data_fingerprint
+
+
+def _result(coef, p_value=0.01):
+    return DiDResult(
+        coefficient=coef, std_error=0.1, t_stat=coef / 0.1, p_value=p_value,
+        ci_lower=coef - 0.196, ci_upper=coef + 0.196, n_obs=17802, n_entities=71,
+        r_squared=0.01, estimator='TWFE'
+    )
+
+
+def test_registry_filters_on_spec_columns(tmp_path):
+    """Query by lockup day / cov type without loading everything."""
+    registry = ResultsRegistry(tmp_path / 'registry.sqlite')
+    registry.record_many([
+        {'result': _result(0.45), 'spec': {'lockup_day': 180, 'cov_type': 'clustered'}},
+        {'result': _result(0.33), 'spec': {'lockup_day': 150, 'cov_type': 'clustered'}},
+        {'result': _result(0.31), 'spec': {'lockup_day': 150, 'cov_type': 'twoway'}},
+    ])
+
+    hits = registry.query(lockup_day=150, cov_type='clustered')
+    assert len(hits) == 1
+    assert hits.loc[0, 'coefficient'] == pytest.approx(0.33)
+    assert len(registry.query(lockup_day=[150, 180])) == 3
+
+    with pytest.raises(ValueError):
+        registry.query(not_a_column=1)
+
+
+def test_registry_parallel_appends(tmp_path):
+    """Concurrent batched appends all land."""
+    path = tmp_path / 'registry.sqlite'
+    ResultsRegistry(path)
+
+    def _append(i):
+        ResultsRegistry(path).record_many(
+            [{'result': _result(0.01 * i), 'spec': {'lockup_day': i}} for _ in range(20)]
+        )
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(_append, range(8)))
+
+    assert len(ResultsRegistry(path).query()) == 160
+
+
+def test_registry_exports_old_csv_layouts(tmp_path):
+    """Exports match the column layout of the existing outputs/results files."""
+    registry = ResultsRegistry(tmp_path / 'registry.sqlite')
+    registry.record(_result(0.45), spec={'lockup_day': 180}, label='Baseline (Day 180)', category='baseline')
+    registry.record(_result(-0.2, 0.2), spec={'lockup_day': 90}, label='Day 90', category='windows')
+
+    coeffs = pd.DataFrame({
+        'event_time': [-2, -1, 0], 'coefficient': [0.1, 0.0, 0.5], 'std_error': [0.1, 0.0, 0.1],
+        'p_value': [0.3, np.nan, 0.001], 'ci_lower': [-0.1, 0.0, 0.3], 'ci_upper': [0.3, 0.0, 0.7]
+    })
+    registry.record_event_study(coeffs, spec={'pre_window': 2, 'post_window': 0})
+
+    main = registry.export_csv('did_main', tmp_path / 'main.csv', lockup_day=180)
+    assert list(main.columns) == [
+        'Treatment_Effect', 'Std_Error', 'T_Stat', 'P_Value', 'CI_Lower', 'CI_Upper', 'N_Obs', 'N_Companies'
+    ]
+    robust = registry.export_csv('robustness', tmp_path / 'robust.csv')
+    assert robust['label'].tolist() == ['Baseline (Day 180)', 'Day 90']
+    assert robust['significant'].tolist() == [True, False]
+
+    es = registry.export_csv('event_study', tmp_path / 'es.csv')
+    assert es['Week'].tolist() == [-2, -1, 0]
+
+
+def test_data_fingerprint_tracks_content():
+    """Fingerprint changes when the data does."""
+    df = pd.DataFrame({'Ticker': ['A', 'B'], 'Abnormal_Return': [0.1, 0.2]})
+    assert data_fingerprint(df) == data_fingerprint(df.copy())
+    assert data_fingerprint(df) != data_fingerprint(df.assign(Abnormal_Return=[0.1, 0.3]))
+
+
+def test_registry_batch_is_one_run(tmp_path):
+    """A record_many batch shares a run id, so latest=True returns all of it."""
+    registry = ResultsRegistry(tmp_path / 'registry.sqlite')
+    registry.record(_result(0.45), kind='per_ticker', label='OLD')
+    run_id = registry.record_many([
+        {'result': _result(0.1 * i), 'kind': 'per_ticker', 'label': f'T{i}'} for i in range(5)
+    ])
+
+    latest = registry.query(kind='per_ticker', latest=True)
+    assert latest['label'].tolist() == [f'T{i}' for i in range(5)]
+    assert (latest['run_id'] == run_id).all()
+
+    # Appending to an existing run
+    registry.record_many([{'result': _result(0.6), 'kind': 'per_ticker', 'label': 'T5'}], run_id=run_id)
+    assert len(registry.query(kind='per_ticker', latest=True)) == 6
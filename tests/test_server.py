@@ -0,0 +1,78 @@
+"""
+Unit tests for the warm analysis server.
+"""
+import json
+import threading
+import urllib.request
+import urllib.error
+import pytest
+from src.server import AnalysisService, make_server
+
+
+@pytest.fixture
+def service(make_staggered_panel):
+    """Service over a small staggered panel."""
+    data = make_staggered_panel(n_ipos=8, n_dates=120, max_start=30, length=80, lockup_day=50, effect=0.0, seed=3)
+    return AnalysisService(data.sort_values(['Ticker', 'Date']))
+
+
+def test_service_caches_repeated_queries(service):
+    first = service.twfe()
+    assert service.twfe() is first
+    assert service.ticker_summary('t3')['ticker'] == 'T3'
+
+    binned = service.event_study(pre_window=20, post_window=20, bins=[-20, -10, 0, 10, 21])
+    assert len(binned) == 4
+    assert len(service._moments) == 1
+
+    with pytest.raises(KeyError):
+        service.ticker_summary('NOPE')
+
+
+def test_server_answers_over_http(service):
+    server = make_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+    try:
+        with urllib.request.urlopen(f'{base}/twfe') as resp:
+            body = json.loads(resp.read())
+        assert body['coefficient'] == pytest.approx(service.twfe()['coefficient'])
+
+        with pytest.raises(urllib.error.HTTPError) as err:
+            urllib.request.urlopen(f'{base}/ticker?symbol=NOPE')
+        assert err.value.code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_slow_query_does_not_block_others(service):
+    """Work runs outside the service lock; one compute per key under concurrency."""
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def _slow():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 'slow'
+
+    results = []
+    workers = [threading.Thread(target=lambda: results.append(service._cached('slow', _slow))) for _ in range(3)]
+    for w in workers:
+        w.start()
+    assert started.wait(5)
+    # Other queries answer while the slow one is still computing
+    assert service.handle('/health', {})['status'] == 'ok'
+    assert service.ticker_summary('T1')['ticker'] == 'T1'
+
+    release.set()
+    for w in workers:
+        w.join(5)
+    assert results == ['slow'] * 3 and len(calls) == 1
+
+    # Failures aren't cached
+    with pytest.raises(ZeroDivisionError):
+        service._cached('bad', lambda: 1 / 0)
+    assert service._cached('bad', lambda: 'ok') == 'ok'